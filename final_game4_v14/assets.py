@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+
+import pygame
+
+from atlas import load_atlas
+
+ASSET_CACHE_SIZE = 4  # scales kept around (the window's and the governor's lower ones), so switching back is instant
+
+
+class AssetBundle:
+    # The pictures the game needs at one scale: the background already
+    # scaled to the play area, and the sprite atlas with every sprite at
+    # its scaled size. extra is for the game to keep its own per-scale
+    # things in (fonts, ...) so they're cached along with the pictures.
+
+    def __init__(self, scale, background, atlas):
+        self.scale = scale
+        self.background = background
+        self.atlas = atlas
+        self.extra = None
+
+
+# Scale everything for one scale. sprites is {name: (image file,
+# (width, height))} in logical pixels, like load_atlas takes.
+def build_assets(scale, background, logical_size, sprites, cache_dir=None):
+    size = (round(logical_size[0] * scale), round(logical_size[1] * scale))
+    picture = pygame.transform.smoothscale(background, size)
+    atlas = load_atlas({name: (path, (max(1, round(width * scale)), max(1, round(height * scale))))
+                        for name, (path, (width, height)) in sprites.items()}, cache_dir)
+    return AssetBundle(scale, picture, atlas)
+
+
+class AssetLoader:
+    # Builds AssetBundles on a worker thread so a resize doesn't freeze the
+    # game while pictures are scaled, and keeps the last few
+    # (ASSET_CACHE_SIZE) so going back to a scale is instant. build is
+    # called as build(scale). Only one build runs at a time: asking for a
+    # new scale while one is running just queues the newest request.
+
+    def __init__(self, build, cache_size=ASSET_CACHE_SIZE):
+        self.build = build
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # scale -> bundle, least recently used first
+        self.lock = threading.Lock()
+        self.worker = None
+        self.building = None  # scale the worker is on
+        self.wanted = None  # scale to build after that
+        self.error = None
+
+    # Bundle for scale straight away (on this thread), e.g. at startup
+    def load(self, scale):
+        with self.lock:
+            bundle = self.cache.get(scale)
+        if bundle is None:
+            bundle = self.build(scale)
+        with self.lock:
+            self.store(scale, bundle)
+        return bundle
+
+    # Bundle for scale if it's ready, otherwise None (and it gets built in
+    # the background, ask again later)
+    def get(self, scale):
+        with self.lock:
+            if self.error is not None:
+                error, self.error = self.error, None
+                raise error
+            bundle = self.cache.get(scale)
+            if bundle is not None:
+                self.cache.move_to_end(scale)
+                return bundle
+            if self.building is None:
+                self.start(scale)
+            elif self.building != scale:
+                self.wanted = scale
+            return None
+
+    def store(self, scale, bundle):
+        self.cache[scale] = bundle
+        self.cache.move_to_end(scale)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    # Only called with the lock held
+    def start(self, scale):
+        self.building = scale
+        self.wanted = None
+        self.worker = threading.Thread(target=self.run, args=(scale,), daemon=True)
+        self.worker.start()
+
+    def run(self, scale):
+        try:
+            bundle = self.build(scale)
+        except Exception as error:
+            bundle = None
+            with self.lock:
+                self.error = error
+        with self.lock:
+            if bundle is not None:
+                self.store(scale, bundle)
+            self.building = None
+            if self.wanted is not None and self.wanted not in self.cache:
+                self.start(self.wanted)
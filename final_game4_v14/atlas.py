@@ -0,0 +1,96 @@
+import glob
+import hashlib
+import json
+import os
+
+import pygame
+
+ATLAS_WIDTH = 256  # pixels, sprites are packed in rows this wide
+PADDING = 1  # empty pixels around each sprite so neighbours never bleed in
+CACHE_KEEP = 4  # atlases kept in the cache dir (one per window scale used lately)
+
+
+class Atlas:
+    # All the game's sprites packed into one surface. rects[name] is where
+    # a sprite sits on it, so drawing one is blit(atlas.surface, pos,
+    # atlas.rects[name]) and every sprite comes from the same source.
+
+    def __init__(self, surface, rects):
+        self.surface = surface
+        self.rects = rects
+
+
+# Copy image onto a clear part of a SRCALPHA surface. MAX onto clear
+# pixels just copies it (a normal alpha blit would darken the anti-aliased
+# edges).
+def paste(surface, image, dest):
+    surface.blit(image, dest, special_flags=pygame.BLEND_RGBA_MAX)
+
+
+# Where each sprite goes: simple shelf packing, tallest first, left to
+# right in rows ATLAS_WIDTH wide. Returns ({name: Rect}, (width, height)).
+def pack(sizes):
+    rects = {}
+    x = y = row_height = 0
+    sheet_width = ATLAS_WIDTH  # a sprite wider than that gets a row to itself and widens the sheet
+    for name in sorted(sizes, key=lambda name: (-sizes[name][1], name)):
+        width, height = sizes[name]
+        if x > 0 and x + width + PADDING > ATLAS_WIDTH:
+            x = 0
+            y += row_height
+            row_height = 0
+        rects[name] = pygame.Rect(x + PADDING, y + PADDING, width, height)
+        x += width + 2 * PADDING
+        row_height = max(row_height, height + 2 * PADDING)
+        sheet_width = max(sheet_width, x)
+    return rects, (sheet_width, y + row_height)
+
+
+# Build (or load from cache_dir) an atlas of sprites, given as
+# {name: (image file, (width, height) to scale it to)}. The cache is
+# keyed on the files' sizes and change times and the requested sizes, so
+# editing an image or a size builds a fresh one. Needs the display set up
+# (for convert_alpha).
+def load_atlas(sprites, cache_dir=None):
+    sources = sorted((name, path, list(size), os.path.getsize(path), os.path.getmtime(path))
+                     for name, (path, size) in sprites.items())
+    key = hashlib.sha1(json.dumps(sources).encode()).hexdigest()[:16]
+
+    if cache_dir is not None:
+        image_path = os.path.join(cache_dir, f"atlas-{key}.png")
+        rects_path = os.path.join(cache_dir, f"atlas-{key}.json")
+        if os.path.exists(image_path) and os.path.exists(rects_path):
+            try:
+                with open(rects_path, "r") as f:
+                    rects = {name: pygame.Rect(rect) for name, rect in json.load(f).items()}
+                surface = pygame.image.load(image_path).convert_alpha()
+                # sheets packed before pack() knew about rows wider than
+                # ATLAS_WIDTH can be too small for their sprites
+                if all(surface.get_rect().contains(rect) for rect in rects.values()):
+                    os.utime(image_path)  # recently used, so it's not the next one pruned
+                    return Atlas(surface, rects)
+            except (OSError, ValueError, pygame.error):
+                pass  # broken cache, just build it again
+
+    rects, size = pack({name: size for name, (path, size) in sprites.items()})
+    surface = pygame.Surface(size, pygame.SRCALPHA)
+    for name, (path, sprite_size) in sprites.items():
+        image = pygame.transform.scale(pygame.image.load(path).convert_alpha(), sprite_size)
+        paste(surface, image, rects[name])
+    surface = surface.convert_alpha()
+
+    if cache_dir is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            pygame.image.save(surface, image_path)
+            with open(rects_path, "w") as f:
+                json.dump({name: list(rect) for name, rect in rects.items()}, f)
+            # only the newest few are worth keeping
+            images = sorted(glob.glob(os.path.join(cache_dir, "atlas-*.png")), key=os.path.getmtime, reverse=True)
+            for old in images[CACHE_KEEP:]:
+                os.remove(old)
+                if os.path.exists(old[:-4] + ".json"):
+                    os.remove(old[:-4] + ".json")
+        except (OSError, pygame.error):
+            pass  # no cache this time, the game still runs
+    return Atlas(surface, rects)
@@ -0,0 +1,158 @@
+import numpy as np
+
+# Block types, stored as small ints in the "type" column
+NORMAL = 0
+SPECIAL = 1
+TYPE_NAMES = ("normal", "special")
+
+# A handle packs a slot index and that slot's generation into one int, so
+# a handle to a block that has since been removed (and its slot reused)
+# can be told apart from the new block living in the same slot
+INDEX_BITS = 20
+INDEX_MASK = (1 << INDEX_BITS) - 1
+
+
+class BlockStore:
+    # Pool of falling blocks stored as a struct of numpy arrays (one column
+    # per field) instead of a list of dicts, so moving every block or
+    # testing them all against a bin is a handful of vectorized calls.
+    #
+    # Positions aren't stepped a tick at a time. A block falls in a straight
+    # line at vy pixels per tick from y0 at tick t0, so its height at any
+    # tick is y0 + vy * (tick - t0), exact to the sub-pixel. The y column is
+    # just that formula evaluated for the sim's current tick.
+    #
+    # Slots are recycled through a free list, so adding and removing a
+    # block is O(1) and nothing is copied or allocated per block. Slots
+    # [0, count) have been used at least once; dead ones sit on the free
+    # list. Since slots get reused, the "order" column (a spawn counter)
+    # says which block is on top, not the slot index.
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.free = []  # dead slots below count, most recently freed last
+        self.next_order = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)  # y at the current tick (see ys_at)
+        self.y0 = np.zeros(capacity)  # y at tick t0
+        self.t0 = np.zeros(capacity, dtype=np.int64)
+        self.vy = np.zeros(capacity)  # pixels per tick, 0 while held
+        self.type = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.order = np.zeros(capacity, dtype=np.int64)  # higher = spawned later = drawn on top
+        self.generation = np.zeros(capacity, dtype=np.int64)  # bumped every time the slot is freed
+        self.expires = np.zeros(capacity, dtype=np.int64)  # tick it falls off screen, -1 while held
+        # cells the block is filed under in the sim's SpatialGrid (its span)
+        self.cell_x0 = np.zeros(capacity, dtype=np.int32)
+        self.cell_y0 = np.zeros(capacity, dtype=np.int32)
+        self.cell_x1 = np.zeros(capacity, dtype=np.int32)
+        self.cell_y1 = np.zeros(capacity, dtype=np.int32)
+
+    def __len__(self):
+        return self.count - len(self.free)
+
+    def columns(self):
+        return ("x", "y", "y0", "t0", "vy", "type", "alive", "order", "generation", "expires",
+                "cell_x0", "cell_y0", "cell_x1", "cell_y1")
+
+    # Slot index of every live block (in slot order, not spawn order)
+    def live(self):
+        return self.alive[:self.count].nonzero()[0]
+
+    # Live blocks sorted oldest first, which is the order to draw them in
+    def live_by_order(self):
+        live = self.live()
+        return live[np.argsort(self.order[live], kind="stable")]
+
+    # Several new blocks at once (arrays), all as of tick t0. Returns
+    # their slots, in the same order.
+    def add_many(self, xs, ys, block_types, vys, t0):
+        count = len(xs)
+        reused = min(count, len(self.free))
+        slots = np.empty(count, dtype=np.intp)
+        for k in range(reused):
+            slots[k] = self.free.pop()
+        fresh = count - reused
+        while self.count + fresh > len(self.alive):
+            self.grow()
+        slots[reused:] = np.arange(self.count, self.count + fresh)
+        self.count += fresh
+
+        self.x[slots] = xs
+        self.y[slots] = self.y0[slots] = ys
+        self.t0[slots] = t0
+        self.vy[slots] = vys
+        self.type[slots] = block_types
+        self.alive[slots] = True
+        self.order[slots] = np.arange(self.next_order, self.next_order + count)
+        self.next_order += count
+        return slots
+
+    def remove(self, i):
+        self.alive[i] = False
+        self.generation[i] += 1
+        self.free.append(int(i))
+
+    # Height of the given slots at any tick (a float tick is fine too, for
+    # drawing between ticks). O(1) per block, no matter how far away.
+    def ys_at(self, slots, tick):
+        return self.y0[slots] + self.vy[slots] * (tick - self.t0[slots])
+
+    # Refresh the y column for a new current tick
+    def update_y(self, tick):
+        n = self.count
+        self.y[:n] = self.y0[:n] + self.vy[:n] * (tick - self.t0[:n])
+
+    # Restart the given blocks' fall from where they are at tick, e.g.
+    # before changing their speed
+    def rebase(self, slots, tick):
+        self.y0[slots] = self.ys_at(slots, tick)
+        self.t0[slots] = tick
+        self.y[slots] = self.y0[slots]
+
+    # Put block i at (x, y) as of tick (dragging)
+    def place(self, i, x, y, tick):
+        self.x[i] = x
+        self.y[i] = self.y0[i] = y
+        self.t0[i] = tick
+
+    # Double the capacity, existing slots keep their index
+    def grow(self):
+        if len(self.alive) * 2 > INDEX_MASK + 1:
+            raise MemoryError("too many blocks for BlockStore handles")
+        for name in self.columns():
+            column = getattr(self, name)
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+
+    # Stable handle for the block in slot i
+    def handle(self, i):
+        return (int(self.generation[i]) << INDEX_BITS) | int(i)
+
+    # Same thing for an array of slots
+    def handles(self, slots):
+        return (self.generation[slots] << INDEX_BITS) | slots
+
+    # Slot index for a handle, or None if that block is gone
+    def index(self, handle):
+        i = handle & INDEX_MASK
+        if i < self.count and self.alive[i] and self.generation[i] == handle >> INDEX_BITS:
+            return i
+        return None
+
+    # Span (see SpatialGrid.span) the block in slot i is filed under
+    def span(self, i):
+        return (int(self.cell_x0[i]), int(self.cell_y0[i]), int(self.cell_x1[i]), int(self.cell_y1[i]))
+
+    def set_span(self, i, span):
+        self.cell_x0[i], self.cell_y0[i], self.cell_x1[i], self.cell_y1[i] = span
+
+    # Topmost of the candidate blocks containing the point, or None
+    def topmost_at(self, candidates, pos, width, height):
+        px, py = pos
+        x, y = self.x[candidates], self.y[candidates]
+        hits = candidates[self.alive[candidates] & (x <= px) & (px < x + width) & (y <= py) & (py < y + height)]
+        if len(hits) == 0:
+            return None
+        return int(hits[np.argmax(self.order[hits])])
@@ -0,0 +1,96 @@
+import numpy as np
+import pygame  # only for handing out pygame.Rects
+
+
+class BinConveyor:
+    # The bins riding the conveyor belt. They all move left at the same
+    # speed and wrap around at the end of the belt, so their order along
+    # the belt never changes. They're kept in a ring sorted by belt
+    # position and scrolling just moves an offset; a bin's screen x is
+    #
+    #     ((pos - scroll) mod length) - bin_width
+    #
+    # which runs from -bin_width (just gone off the left edge) up to
+    # length - bin_width. The belt is at least one screen plus one bin long
+    # and grows when more bins are asked for than fit on it.
+    #
+    # The offset at any tick is (speed * tick) mod length, so there's
+    # nothing to step: set_tick() can jump to any tick in O(1).
+
+    def __init__(self, count, rng, screen_width, bin_width, bin_height, y, spacing, speed):
+        self.screen_width = screen_width
+        self.bin_width = bin_width
+        self.bin_height = bin_height
+        self.y = y
+        self.length = max(screen_width + bin_width, count * spacing)
+        self.speed = speed  # pixels per tick
+        self.scroll = 0.0
+
+        # O(count) placement: cut the belt into equal slots and drop one bin
+        # somewhere in each, keeping at least `spacing` between left edges
+        slot = self.length / count
+        self.pos = np.array([k * slot + rng.uniform(0, slot - spacing) for k in range(count)])
+
+    def __len__(self):
+        return len(self.pos)
+
+    # Total distance the belt has moved by any tick (float ticks are fine,
+    # for drawing)
+    def travel_at(self, tick):
+        return self.speed * tick
+
+    # Scroll offset at any tick
+    def scroll_at(self, tick):
+        return self.travel_at(tick) % self.length
+
+    def set_tick(self, tick):
+        self.scroll = self.scroll_at(tick)
+
+    # Screen x of every bin (belt order) at a scroll offset
+    def xs(self, scroll=None):
+        if scroll is None:
+            scroll = self.scroll
+        return (self.pos - scroll) % self.length - self.bin_width
+
+    # Ring index of the leftmost bin on screen (smallest screen x)
+    def head(self, scroll=None):
+        if scroll is None:
+            scroll = self.scroll
+        return int(np.searchsorted(self.pos, scroll % self.length)) % len(self.pos)
+
+    # Indices of bins at least partly on screen, left to right. Walks the
+    # ring from the head so it only touches the bins it returns.
+    def visible(self, scroll=None):
+        if scroll is None:
+            scroll = self.scroll
+        count = len(self.pos)
+        start = self.head(scroll)
+        found = []
+        for k in range(count):
+            b = (start + k) % count
+            x = (self.pos[b] - scroll) % self.length - self.bin_width
+            if x >= self.screen_width:
+                break
+            if x > -self.bin_width:
+                found.append(b)
+        return found
+
+    def rect(self, b):
+        x = (self.pos[b] - self.scroll) % self.length - self.bin_width
+        return pygame.Rect(round(x), self.y, self.bin_width, self.bin_height)
+
+    def rects(self):
+        return [self.rect(b) for b in self.visible()]
+
+    # For blocks at xs (left edges) that are width wide, the leftmost bin
+    # each one overlaps horizontally, or -1. Vectorized binary search: a
+    # bin overlaps [x, x + width) when its "x + bin_width" lands in
+    # (x, x + width + bin_width), so look up the first bin past x on the
+    # belt and check whether it is close enough.
+    def first_hit(self, xs, width):
+        count = len(self.pos)
+        after = (xs + self.scroll) % self.length
+        nearest = np.searchsorted(self.pos, after, side="right") % count
+        reach = (self.pos[nearest] - self.scroll) % self.length  # that bin's x + bin_width
+        hit = (reach > xs) & (reach < xs + width + self.bin_width)
+        return np.where(hit, nearest, -1)
@@ -0,0 +1,59 @@
+from collections import deque
+
+# Quality levels, best first. resolution is how big gameplay is drawn
+# compared to the window (then scaled up), popups is whether the floating
+# score/level texts are drawn at all.
+QUALITY_LEVELS = (
+    {"name": "full", "resolution": 1.0, "popups": True},
+    {"name": "no popups", "resolution": 1.0, "popups": False},
+    {"name": "3/4 resolution", "resolution": 0.75, "popups": False},
+    {"name": "1/2 resolution", "resolution": 0.5, "popups": False},
+)
+FRAME_BUDGET = 1 / 60  # seconds of work a frame can take
+SLOW_FRAMES = 30  # frames averaged to decide things are too slow
+FAST_FRAMES = 180  # frames that all have to have room to spare before going back up
+HEADROOM = 0.6  # "room to spare" is under this much of the budget
+
+
+class QualityGovernor:
+    # Watches how long frames take to make (not counting the wait for the
+    # frame cap) and trades looks for speed. When the average of the last
+    # SLOW_FRAMES frames is over budget it drops a quality level. It only
+    # goes back up after FAST_FRAMES frames in a row well under budget, so
+    # it doesn't flip between two levels every second. After a change it
+    # starts measuring again from scratch (the new level costs something
+    # different). level is the index into QUALITY_LEVELS, 0 is best.
+
+    def __init__(self, levels=QUALITY_LEVELS, budget=FRAME_BUDGET):
+        self.levels = levels
+        self.budget = budget
+        self.level = 0
+        self.times = deque(maxlen=FAST_FRAMES)
+
+    @property
+    def quality(self):
+        return self.levels[self.level]
+
+    @property
+    def name(self):
+        return self.quality["name"]
+
+    # Add one frame's work time in seconds. Returns True if the level changed.
+    def add(self, seconds):
+        times = self.times
+        times.append(seconds)
+        if len(times) >= SLOW_FRAMES and self.level < len(self.levels) - 1:
+            recent = sum(times[i] for i in range(len(times) - SLOW_FRAMES, len(times))) / SLOW_FRAMES
+            if recent > self.budget:
+                return self.set_level(self.level + 1)
+        if len(times) == FAST_FRAMES and self.level > 0 and max(times) < self.budget * HEADROOM:
+            return self.set_level(self.level - 1)
+        return False
+
+    def set_level(self, level):
+        level = min(max(level, 0), len(self.levels) - 1)
+        if level == self.level:
+            return False
+        self.level = level
+        self.times.clear()
+        return True
@@ -0,0 +1,172 @@
+# Run the game simulation with no window, as fast as the CPU allows.
+# Useful for balance sweeps and regression checks on headless machines:
+#
+#   python headless.py --mode levels --ticks 100000 --seeds 1 2 3 --autoplay
+#
+# and to check the endurance levels stay bounded (exits with an error if
+# more than --max-blocks are ever falling at once):
+#
+#   python headless.py --mode levels --start-level 80 --lives 1000000 --ticks 36000 --max-blocks 2000
+#
+# and that fast forwarding ends up exactly where stepping every tick does
+# (exits with an error if not, run it over a few level ups):
+#
+#   python headless.py --mode levels --lives 1000000 --ticks 30000 --seeds 1 2 3 --check-fast-forward
+#
+# and that the sprite atlas has room for every sprite at any window scale:
+#
+#   python headless.py --check-atlas
+#
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from atlas import pack
+from sim import Simulation, TICK_RATE, BLOCK_WIDTH, BLOCK_HEIGHT, BIN_WIDTH, BIN_HEIGHT, LEVEL_SCORE_GOAL
+
+SPRITE_SIZES = {"plastic": (BLOCK_WIDTH, BLOCK_HEIGHT), "special_plastic": (BLOCK_WIDTH, BLOCK_HEIGHT),
+                "bin": (BIN_WIDTH, BIN_HEIGHT)}  # logical sizes, like the game's SPRITES
+
+
+# Very simple bot: grab the lowest block and carry it towards the nearest bin,
+# moving the "mouse" at most hand_speed pixels per tick
+def autoplay(sim, hand_speed):
+    blocks = sim.blocks
+    if sim.dragging_block is None:
+        live = blocks.live()
+        if len(live) == 0:
+            return
+        lowest = live[np.argmax(blocks.y[live])]
+        sim.grab((blocks.x[lowest] + BLOCK_WIDTH / 2, blocks.y[lowest] + BLOCK_HEIGHT / 2))
+
+    i = sim.dragged_index()
+    if i is None:
+        return
+    center_x = blocks.x[i] + BLOCK_WIDTH / 2
+    center_y = blocks.y[i] + BLOCK_HEIGHT / 2
+    bin_rects = sim.conveyor.rects()
+    if not bin_rects:
+        return
+    target = min(bin_rects, key=lambda bin_rect: abs(bin_rect.centerx - center_x))
+    dx = max(-hand_speed, min(hand_speed, target.centerx - center_x))
+    dy = max(-hand_speed, min(hand_speed, target.centery - center_y))
+    sim.drag_to((blocks.x[i] + sim.drag_offset_x + dx, blocks.y[i] + sim.drag_offset_y + dy))
+
+
+def new_sim(game_mode, seed, start_level=1, lives=None):
+    sim = Simulation(game_mode, seed=seed)
+    if game_mode == "levels" and start_level > 1:
+        sim.current_level = start_level
+        sim.points = (start_level - 1) * LEVEL_SCORE_GOAL
+        sim.update_level_modifiers()
+    if lives is not None:
+        sim.lives = lives
+    return sim
+
+
+# Everything a run ends up with that fast forwarding could get wrong
+def outcome(sim):
+    live = sim.blocks.live_by_order()
+    return (sim.tick, sim.points, sim.lives, sim.current_level, sim.game_over, sim.blocks.x[live].tolist(),
+            sim.blocks.y[live].tolist(), sim.blocks.type[live].tolist())
+
+
+# True if fast_forward(ticks) leaves the sim the same as ticks step() calls
+def fast_forward_matches(game_mode, seed, ticks, start_level=1, lives=None):
+    skipping = new_sim(game_mode, seed, start_level, lives)
+    skipping.fast_forward(ticks)
+    stepping = new_sim(game_mode, seed, start_level, lives)
+    while stepping.tick < ticks and not stepping.game_over:
+        stepping.step()
+    return outcome(skipping) == outcome(stepping)
+
+
+# Window scales (from 0.5 to 10, every 0.05) where pack() puts a sprite
+# outside the sheet it says to make
+def atlas_overflows():
+    bad = []
+    for step in range(10, 201):
+        scale = step / 20
+        rects, size = pack({name: (max(1, round(width * scale)), max(1, round(height * scale)))
+                            for name, (width, height) in SPRITE_SIZES.items()})
+        sheet = (0, 0) + size
+        if not all(rect.clip(sheet) == rect for rect in rects.values()):
+            bad.append(scale)
+    return bad
+
+
+# Returns the sim and the most blocks that were ever falling at once (None
+# if that wasn't watched, fast forwarding doesn't look at every tick)
+def run(game_mode, seed, ticks, use_autoplay, hand_speed, start_level=1, lives=None, watch_blocks=False):
+    sim = new_sim(game_mode, seed, start_level, lives)
+    if not use_autoplay and not watch_blocks:
+        # nobody is playing, so skip straight over the quiet stretches
+        sim.fast_forward(ticks)
+        return sim, None
+    peak = 0
+    while sim.tick < ticks and not sim.game_over:
+        if use_autoplay:
+            autoplay(sim, hand_speed)
+        sim.step()
+        peak = max(peak, len(sim.blocks))
+    return sim, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the plastic game simulation without a display")
+    parser.add_argument("--mode", choices=["levels", "freeplay"], default="freeplay")
+    parser.add_argument("--ticks", type=int, default=TICK_RATE * 60 * 10, help=f"max ticks per run ({TICK_RATE} ticks = 1 second)")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--autoplay", action="store_true", help="let a simple bot drag blocks into bins")
+    parser.add_argument("--hand-speed", type=int, default=12, help="bot mouse speed in pixels per tick")
+    parser.add_argument("--start-level", type=int, default=1, help="level to start at (levels mode)")
+    parser.add_argument("--lives", type=int, help="lives to start with, so a long run doesn't end early")
+    parser.add_argument("--max-blocks", type=int, help="fail if more than this many blocks are ever falling at once")
+    parser.add_argument("--check-fast-forward", action="store_true",
+                        help="fail if fast forwarding ends up anywhere different from stepping every tick")
+    parser.add_argument("--check-atlas", action="store_true", help="fail if a sprite doesn't fit its atlas at some scale")
+    args = parser.parse_args()
+
+    if args.check_atlas:
+        bad = atlas_overflows()
+        if bad:
+            sys.exit(f"sprites don't fit the atlas at scales {bad}")
+        print("every sprite fits the atlas at every scale")
+        return
+
+    if args.check_fast_forward:
+        different = [seed for seed in args.seeds
+                     if not fast_forward_matches(args.mode, seed, args.ticks, args.start_level, args.lives)]
+        print(f"fast forward matches stepping for {len(args.seeds) - len(different)} of {len(args.seeds)} seeds")
+        if different:
+            sys.exit(f"fast forward went differently with seeds {different}")
+        return
+
+    watch_blocks = args.max_blocks is not None
+    print(f"{'seed':>6} {'ticks':>9} {'points':>8} {'level':>6} {'lives':>8} {'peak':>6}  result")
+    total_ticks = 0
+    too_many = []
+    start = time.perf_counter()
+    for seed in args.seeds:
+        sim, peak = run(args.mode, seed, args.ticks, args.autoplay, args.hand_speed, args.start_level, args.lives,
+                        watch_blocks)
+        total_ticks += sim.tick
+        result = "game over" if sim.game_over else "alive"
+        if watch_blocks and peak > args.max_blocks:
+            too_many.append(seed)
+            result += ", too many blocks"
+        peak_text = "-" if peak is None else str(peak)
+        print(f"{seed:>6} {sim.tick:>9} {sim.points:>8} {sim.current_level:>6} {sim.lives:>8} {peak_text:>6}  {result}")
+    elapsed = time.perf_counter() - start
+    print(f"{total_ticks} ticks in {elapsed:.2f}s ({total_ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+    if too_many:
+        sys.exit(f"more than {args.max_blocks} blocks falling at once with seeds {too_many}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+
+INPUT_EVENTS = (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.KEYDOWN, pygame.KEYUP)
+LATENCY_SAMPLES = 5000  # kept per (scene, input type), older ones are dropped
+PERCENTILES = (50, 90, 99)
+
+
+class LatencyTracker:
+    # Input-to-photon latency: how long from an input event arriving to
+    # the frame that used it being sent to the display. The game calls
+    # consume() for each input event a frame handles (with when it was
+    # taken off the queue), presented() right after each display
+    # flip/update, and end_frame() when the frame is done. A frame that
+    # doesn't present anything (a menu where nothing changed) shows no
+    # result of its input, so its events are just dropped.
+    #
+    # "Arrived" is when the main loop woke up for the event. It sleeps in
+    # pygame.event.wait() (see scenes.py), so that's when the event came
+    # in, except for ones that came while a frame was being worked on:
+    # those count from the end of that frame, when the loop next looks.
+
+    def __init__(self, max_samples=LATENCY_SAMPLES):
+        self.max_samples = max_samples
+        self.pending = []  # (scene, input type, arrival time) used this frame
+        self.samples = {}  # (scene, input type) -> deque of seconds
+
+    def consume(self, scene, event, arrived):
+        if event.type in INPUT_EVENTS:
+            self.pending.append((scene, pygame.event.event_name(event.type), arrived))
+
+    def presented(self, when=None):
+        if not self.pending:
+            return
+        when = time.perf_counter() if when is None else when
+        for scene, kind, arrived in self.pending:
+            samples = self.samples.get((scene, kind))
+            if samples is None:
+                samples = self.samples[scene, kind] = deque(maxlen=self.max_samples)
+            samples.append(when - arrived)
+        self.pending = []
+
+    def end_frame(self):
+        self.pending = []
+
+    # {(scene, input type): (count, [ms at each of PERCENTILES])}
+    def percentiles(self, percentiles=PERCENTILES):
+        return {key: (len(samples), (np.percentile(np.array(samples), percentiles) * 1000).tolist())
+                for key, samples in sorted(self.samples.items())}
+
+    def report(self, percentiles=PERCENTILES):
+        lines = ["input latency, ms", f"  {'input':20s}  {'scene':10s}  {'count':>6s}  " + "  ".join(f"{'p' + str(p):>6s}" for p in percentiles)]
+        for (scene, kind), (count, values) in self.percentiles(percentiles).items():
+            lines.append(f"  {kind:20s}  {scene:10s}  {count:6d}  " + "  ".join(f"{value:6.1f}" for value in values))
+        return "\n".join(lines)
@@ -0,0 +1,91 @@
+import pygame
+
+from view import letterbox
+
+BELT_COLOR = (70, 70, 80)
+BELT_STRIPE_COLOR = (115, 115, 125)
+BELT_EDGE_COLOR = (40, 40, 45)  # also the rail along the top of the belt
+BELT_STRIPE_SPACING = 20  # logical pixels between the stripes on the belt
+BELT_STRIPE_WIDTH = 6
+
+
+class BeltStrip:
+    # The moving part of the conveyor: a cached strip of belt that's moved
+    # along with Surface.scroll(). Only the few columns that scroll into
+    # view get drawn, everything else is just shifted.
+
+    def __init__(self, width, height, scale=1):
+        self.spacing = max(2, round(BELT_STRIPE_SPACING * scale))
+        self.surface = pygame.Surface((width, height))
+        self.tile = pygame.Surface((self.spacing, height))
+        self.tile.fill(BELT_COLOR)
+        pygame.draw.rect(self.tile, BELT_STRIPE_COLOR, (0, 2, max(1, round(BELT_STRIPE_WIDTH * scale)), height - 4))
+        pygame.draw.line(self.tile, BELT_EDGE_COLOR, (0, 0), (self.spacing, 0), 2)
+        pygame.draw.line(self.tile, BELT_EDGE_COLOR, (0, height - 1), (self.spacing, height - 1), 2)
+        self.offset = 0  # how far the belt has moved left, in pixels
+        self.draw_columns(0, width)
+
+    # Redraw columns x0 to x1 of the strip from the tile
+    def draw_columns(self, x0, x1):
+        self.surface.set_clip((x0, 0, x1 - x0, self.surface.get_height()))
+        x = x0 - (x0 + self.offset) % self.spacing
+        while x < x1:
+            self.surface.blit(self.tile, (x, 0))
+            x += self.spacing
+        self.surface.set_clip(None)
+
+    def scroll_to(self, offset):
+        moved = offset - self.offset
+        if moved == 0:
+            return
+        width = self.surface.get_width()
+        self.offset = offset
+        if abs(moved) >= width:
+            self.draw_columns(0, width)
+            return
+        self.surface.scroll(-moved, 0)
+        if moved > 0:
+            self.draw_columns(width - moved, width)  # new belt comes in on the right
+        else:
+            self.draw_columns(0, -moved)
+
+
+class LayerCompositor:
+    # The play area's backdrop in layers. The static layer (the background
+    # picture and the belt's rail, letterboxed into the window) is built
+    # once and only rebuilt when the window changes;
+    # the renderer paints it back under whatever moved. The belt is the
+    # only moving layer and costs one scroll and a blit.
+    #
+    # background is the picture already scaled to the play area (see
+    # assets.py), belt_height is in logical pixels.
+
+    def __init__(self, background, viewport, belt_height):
+        self.background = background
+        self.belt_height = belt_height
+        self.viewport = None
+        self.static = None
+        self.belt = None
+        self.rebuild(viewport)
+
+    def rebuild(self, viewport):
+        self.viewport = viewport
+        width, height = viewport.size
+        belt_height = viewport.length(self.belt_height)
+        self.static = letterbox(self.background, viewport)
+        # rail along the top of the belt, it doesn't move so it lives here
+        x, y = viewport.offset
+        pygame.draw.rect(self.static, BELT_EDGE_COLOR, (x, y + height - belt_height - 3, width, 3))
+        self.belt = BeltStrip(width, belt_height, viewport.scale)
+        self.belt_pos = (x, y + height - belt_height)
+
+    # New window size or scale, background is the picture for the new scale
+    def resize(self, background, viewport):
+        self.background = background
+        self.rebuild(viewport)
+
+    # Draw the moving layers. travel is how far the conveyor has moved, in
+    # logical pixels (not wrapped round, so the stripes never jump).
+    def draw_moving(self, target, travel):
+        self.belt.scroll_to(int(travel * self.viewport.scale))
+        return target.blit(self.belt.surface, self.belt_pos)
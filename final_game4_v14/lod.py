@@ -0,0 +1,62 @@
+import numpy as np
+
+from spatial import CELL_SIZE
+
+# How blocks are drawn when there are lots of them:
+#   0  every block is its sprite
+#   1  crowded grid cells become one cluster imposter (a filled box over
+#      the cell's blocks), the rest are still sprites
+#   2  like 1, and the rest are small solid squares instead of sprites
+LOD_COUNTS = (300, 1200)  # blocks on screen to switch to LOD 1 and LOD 2
+LOD_EXIT = 0.75  # a LOD is only left when the count drops below this much of what it took to get there
+CLUSTER_MIN = 6  # blocks in one grid cell to draw them as a cluster
+
+
+class LodSelector:
+    # Picks the LOD for a block count with hysteresis, so a count that
+    # hovers around a threshold doesn't flip the look every frame.
+
+    def __init__(self, counts=LOD_COUNTS, exit_ratio=LOD_EXIT):
+        self.counts = counts
+        self.exit_ratio = exit_ratio
+        self.level = 0
+
+    def update(self, count):
+        while self.level < len(self.counts) and count >= self.counts[self.level]:
+            self.level += 1
+        while self.level > 0 and count < self.counts[self.level - 1] * self.exit_ratio:
+            self.level -= 1
+        return self.level
+
+
+# Group blocks (top-left xs, ys, same grid as the sim's SpatialGrid) into
+# crowded cells. Returns (loose, boxes, types): loose is a mask of the
+# blocks that aren't in a crowded cell, boxes is (x0, y0, x1, y1) per
+# cluster, the area its blocks' top-lefts cover, and types is the type
+# most of a cluster's blocks are.
+def find_clusters(xs, ys, types, min_count=CLUSTER_MIN, cell_size=CELL_SIZE):
+    cells_x = np.floor_divide(xs, cell_size).astype(np.int64) + (1 << 20)
+    cells_y = np.floor_divide(ys, cell_size).astype(np.int64) + (1 << 20)  # offset, blocks above the screen have negative y
+    cells, which, counts = np.unique(cells_x << 32 | cells_y, return_inverse=True, return_counts=True)
+    crowded = counts >= min_count
+    loose = ~crowded[which]
+    if loose.all():
+        return loose, np.zeros((0, 4)), np.zeros(0, dtype=types.dtype)
+
+    # renumber the crowded cells 0..n-1 and take each one's bounding box
+    cluster = np.cumsum(crowded) - 1
+    member = ~loose
+    ids = cluster[which[member]]
+    n = int(crowded.sum())
+    boxes = np.empty((n, 4))
+    boxes[:, 0] = boxes[:, 1] = np.inf
+    boxes[:, 2] = boxes[:, 3] = -np.inf
+    np.minimum.at(boxes[:, 0], ids, xs[member])
+    np.minimum.at(boxes[:, 1], ids, ys[member])
+    np.maximum.at(boxes[:, 2], ids, xs[member])
+    np.maximum.at(boxes[:, 3], ids, ys[member])
+    # majority type: count each type per cluster
+    kinds, type_index = np.unique(types[member], return_inverse=True)
+    tally = np.zeros((n, len(kinds)), dtype=np.int64)
+    np.add.at(tally, (ids, type_index), 1)
+    return loose, boxes, kinds[np.argmax(tally, axis=1)]
@@ -0,0 +1,71 @@
+import numpy as np
+
+POPUP_KINDS = ("normal", "special", "level_up")  # stored as their index
+MAX_POPUPS = 64  # more than this at once and the oldest ones go
+
+
+class PopupPool:
+    # Floating "+100" / "Level 5!" texts as a fixed ring of numpy columns.
+    # Adding one takes the next slot round the ring, so when every slot is
+    # in use the oldest popup is the one that gets overwritten, and
+    # nothing is allocated or removed from a list while playing. Expiring
+    # and moving all of them are single vectorized operations.
+    #
+    # Texts aren't stored per popup: each distinct string gets an id the
+    # first time it's used, so all "+100"s share one entry (and the
+    # renderer can share one surface).
+
+    def __init__(self, capacity=MAX_POPUPS):
+        self.capacity = capacity
+        self.next = 0  # slot the next popup goes in, also the oldest one
+        self.texts = []  # text id -> string
+        self.text_ids = {}  # string -> text id
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.text = np.zeros(capacity, dtype=np.int32)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.start = np.zeros(capacity, dtype=np.int64)  # tick it appeared
+        self.rise = np.zeros(capacity)  # pixels per tick
+        self.expires = np.zeros(capacity, dtype=np.int64)  # first tick it's gone
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def text_id(self, text):
+        text_id = self.text_ids.get(text)
+        if text_id is None:
+            text_id = self.text_ids[text] = len(self.texts)
+            self.texts.append(text)
+        return text_id
+
+    def add(self, kind, text, x, y, tick, rise, expires):
+        i = self.next
+        self.next = (i + 1) % self.capacity
+        self.kind[i] = POPUP_KINDS.index(kind)
+        self.text[i] = self.text_id(text)
+        self.x[i] = x
+        self.y[i] = y
+        self.start[i] = tick
+        self.rise[i] = rise
+        self.expires[i] = expires
+        self.alive[i] = True
+        return i
+
+    # Drop every popup whose time is up by tick
+    def expire(self, tick):
+        self.alive &= self.expires > tick
+
+    def clear(self):
+        self.alive[:] = False
+
+    # Live slots, oldest first (the order to draw them in)
+    def live(self):
+        order = (np.arange(self.capacity) + self.next) % self.capacity
+        return order[self.alive[order]]
+
+    # (kinds, text ids, xs, ys) of the live popups at a (fractional) tick
+    def positions_at(self, tick):
+        live = self.live()
+        ys = self.y[live] - self.rise[live] * (tick - self.start[live])
+        return self.kind[live], self.text[live], self.x[live], ys
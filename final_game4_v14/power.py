@@ -0,0 +1,32 @@
+import pygame
+
+LOW_POWER_FPS = 4  # frames a second while nobody is looking at the game
+
+
+class PowerManager:
+    # Keeps track of whether anyone can see the game, from the window
+    # events. Another window having focus, or this one being minimized or
+    # hidden, means low power: the game should pause and wake up as little
+    # as possible. hidden means there's no point drawing at all.
+
+    def __init__(self):
+        self.focused = True
+        self.hidden = False
+
+    @property
+    def low_power(self):
+        return self.hidden or not self.focused
+
+    # Returns True if the event changed anything
+    def handle(self, event):
+        if event.type == pygame.WINDOWFOCUSLOST:
+            self.focused = False
+        elif event.type == pygame.WINDOWFOCUSGAINED:
+            self.focused = True
+        elif event.type in (pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN):
+            self.hidden = True
+        elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWMAXIMIZED, pygame.WINDOWSHOWN):
+            self.hidden = False
+        else:
+            return False
+        return True
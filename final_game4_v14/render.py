@@ -0,0 +1,123 @@
+import pygame
+
+UPSCALE_MAX_RECTS = 64  # more changed rects than this and upscale() just does the whole thing
+
+
+class DirtyRenderer:
+    # Draws a frame without repainting the whole window. Everything drawn
+    # goes through blit(), which remembers the rect it covered. Next frame,
+    # begin() paints the background back over just those rects, and
+    # finish() gives the old and new rects, for the game to send to the
+    # display with pygame.display.update(rects) instead of flipping all
+    # 800x600 pixels.
+    #
+    # invalidate() forces one full repaint and flip, for when something
+    # drew over the screen behind the renderer's back (menus, pause).
+    # With enabled=False every frame is a full repaint, like before.
+
+    def __init__(self, screen, background, enabled=True):
+        self.screen = screen
+        self.background = background
+        self.enabled = enabled
+        self.drawn = []  # rects drawn this frame
+        self.erased = []  # rects drawn last frame, painted over by begin()
+        self.full = True
+
+    def invalidate(self):
+        self.full = True
+
+    # New picture to paint back under things (repaints everything once)
+    def set_background(self, background):
+        self.background = background
+        self.full = True
+
+    # Start a frame: put the background back where last frame drew
+    def begin(self):
+        screen = self.screen
+        if self.full or not self.enabled:
+            screen.blit(self.background, (0, 0))
+            self.erased = []
+        else:
+            self.erased = self.drawn
+            for rect in self.erased:
+                screen.blit(self.background, rect, rect)
+        self.drawn = []
+
+    def blit(self, surface, pos, area=None):
+        rect = self.screen.blit(surface, pos, area)
+        if rect.width and rect.height:  # nothing to redo if it was all off screen
+            self.drawn.append(rect)
+        return rect
+
+    # Solid box, see Surface.fill
+    def fill(self, color, rect):
+        rect = self.screen.fill(color, rect)
+        if rect.width and rect.height:
+            self.drawn.append(rect)
+        return rect
+
+    # Many (surface, pos) blits in one call, see Surface.blits
+    def blits(self, sequence):
+        rects = self.screen.blits(sequence)
+        self.drawn.extend(rect for rect in rects if rect.width and rect.height)
+        return rects
+
+    # End the frame: the rects of the screen that changed, or None if all
+    # of it did
+    def finish(self):
+        if self.full or not self.enabled:
+            self.full = False
+            return None
+        return self.erased + self.drawn
+
+
+# Copy the rects (None for all of it) of a small render target onto
+# dest_rect of target, scaled up to fit. For drawing at a lower
+# resolution than the window. Returns the rects of target that changed.
+def upscale(source, rects, target, dest_rect):
+    if rects is None or len(rects) > UPSCALE_MAX_RECTS:
+        rects = [source.get_rect()]
+    fx = dest_rect.width / source.get_width()
+    fy = dest_rect.height / source.get_height()
+    bounds = source.get_rect()
+    changed = []
+    for rect in rects:
+        rect = rect.inflate(2, 2).clip(bounds)  # a pixel more round it so scaled edges line up
+        if not rect.width or not rect.height:
+            continue
+        left, top = int(rect.left * fx), int(rect.top * fy)
+        size = (int(rect.right * fx + 0.999) - left, int(rect.bottom * fy + 0.999) - top)
+        changed.append(target.blit(pygame.transform.scale(source.subsurface(rect), size),
+                                   (dest_rect.left + left, dest_rect.top + top)))
+    return changed
+
+
+class RenderQueue:
+    # Collects a frame's sprite draws and sends them to the screen with
+    # one Surface.blits() call per layer instead of a blit() call per
+    # sprite. Layers are drawn in the order given, and sprites in a layer
+    # in the order they were added (so what's drawn on top is what was
+    # added last). area is a sub-rect of the surface, for sprites out of
+    # an Atlas.
+
+    def __init__(self, layers):
+        self.layers = {name: [] for name in layers}  # layer -> [(surface, pos, area)]
+
+    def add(self, layer, surface, pos, area=None):
+        self.layers[layer].append((surface, pos, area))
+
+    # Same sprite at lots of positions, e.g. zip(xs, ys)
+    def add_many(self, layer, surface, positions, area=None):
+        self.layers[layer].extend((surface, pos, area) for pos in positions)
+
+    # Different sprites, as (surface, pos, area) like Surface.blits takes
+    def add_sprites(self, layer, sprites):
+        self.layers[layer].extend(sprites)
+
+    # Draw the given layers (default all) onto target and empty them
+    def flush(self, target, layers=None):
+        for name in layers or self.layers:
+            sprites = self.layers[name]
+            if sprites:
+                target.blits(sprites)
+                sprites.clear()
@@ -0,0 +1,190 @@
+import math
+import time
+
+import pygame
+
+# Tick policies, how the main loop waits between two frames of a scene
+FRAME = "frame"  # every frame, capped at the frame rate (gameplay)
+IDLE = "idle"  # asleep in pygame.event.wait() until something happens (menus)
+IDLE_TIMEOUT = 100  # ms, an idle scene still wakes up this often (to pick up a window resize, ...)
+
+
+# Replace each run of MOUSEMOTION events in a row with one event at the
+# last position (rel added up), so a fast-polling mouse costs the same as
+# a slow one. Everything else keeps its order, so a button press or
+# release still sees the motion that came before it. events is
+# (event, arrival time) pairs, a merged motion keeps the first one's time.
+def coalesce_motion(events):
+    result = []
+    run = []
+    for event, arrived in events:
+        if event.type == pygame.MOUSEMOTION:
+            run.append((event, arrived))
+            continue
+        if run:
+            result.append(merge_motion(run))
+            run = []
+        result.append((event, arrived))
+    if run:
+        result.append(merge_motion(run))
+    return result
+
+
+def merge_motion(run):
+    if len(run) == 1:
+        return run[0]
+    last = run[-1][0]
+    rel = (sum(event.rel[0] for event, arrived in run), sum(event.rel[1] for event, arrived in run))
+    merged = pygame.event.Event(pygame.MOUSEMOTION, pos=last.pos, rel=rel, buttons=last.buttons,
+                                touch=getattr(last, "touch", False), window=getattr(last, "window", None))
+    return merged, run[0][1]
+
+
+class Scene:
+    # One screen of the game (title, playing, paused, game over). The
+    # SceneManager calls enter() when it becomes the current scene and
+    # leave() when another one takes over, handle() with each event, then
+    # update() and draw() once per frame.
+    # tick_policy says how the loop waits for the next frame: a scene
+    # where nothing moves by itself should be IDLE so it doesn't keep a
+    # CPU core busy. events is the event types the scene uses (None for
+    # all of them), anything else is kept out of the queue while it's on.
+    tick_policy = FRAME
+    events = None
+
+    def enter(self):
+        pass
+
+    def leave(self):
+        pass
+
+    def handle(self, event):
+        pass
+
+    def update(self, frame_time):
+        pass
+
+    def draw(self):
+        pass
+
+
+class SceneManager:
+    # The main loop. Runs the current scene, waiting between frames the
+    # way the scene's tick_policy says. switch() changes scene straight
+    # away, so the rest of a frame's events already go to the new one.
+    #
+    # on_event is called with every event before the scene gets it (for
+    # things like resizing that work the same on every screen),
+    # before_frame before each update. frame_start is when the frame's
+    # work started, after the wait.
+    #
+    # Events are blocked with pygame.event.set_allowed() to what the scene
+    # (and always_allowed, for on_event) needs, and runs of mouse motion
+    # are coalesced into one event (see coalesce_motion()).
+    #
+    # fps and idle_timeout can be changed while running (to slow down when
+    # the window is in the background), and drawing=False skips draw()
+    # altogether (nothing can be seen).
+    #
+    # latency, if set, is a LatencyTracker (latency.py) that's told about
+    # every event a scene handles and when each frame ends. To time each
+    # event from when it comes in, a FRAME scene then sleeps out the rest
+    # of the frame in pygame.event.wait() instead of clock.tick(). That
+    # wakes up for every event (a fast mouse is a lot of wake ups), so
+    # it's only done while measuring.
+
+    def __init__(self, scenes, clock, fps, max_frame_time):
+        self.scenes = scenes  # name -> Scene
+        self.clock = clock
+        self.fps = fps
+        self.max_frame_time = max_frame_time
+        self.idle_timeout = IDLE_TIMEOUT
+        self.always_allowed = [pygame.QUIT]
+        self.drawing = True
+        self.scene = None
+        self.name = None
+        self.running = False
+        self.switched = False
+        self.on_event = None
+        self.before_frame = None
+        self.frame_start = 0.0
+        self.latency = None
+
+    def switch(self, name):
+        if self.scene is not None:
+            self.scene.leave()
+        self.name = name
+        self.scene = self.scenes[name]
+        self.switched = True
+        self.allow_events(self.scene)
+        self.scene.enter()
+
+    def allow_events(self, scene):
+        if scene.events is None:
+            pygame.event.set_allowed(None)
+        else:
+            pygame.event.set_blocked(None)
+            pygame.event.set_allowed(list(self.always_allowed) + list(scene.events))
+
+    def stop(self):
+        self.running = False
+
+    # Everything already in the queue, as (event, arrival time) pairs
+    def get_events(self, arrived):
+        return [(event, arrived) for event in pygame.event.get()]
+
+    # Wait until a frame after the last one started (1 / fps seconds),
+    # taking events as they come. Ones that were already queued when the
+    # wait starts (they came during the last frame) count from then.
+    def wait_frame(self):
+        deadline = self.frame_start + 1 / self.fps
+        events = self.get_events(time.perf_counter())
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return events
+            event = pygame.event.wait(math.ceil(remaining * 1000))  # ms, at least 1 (0 would wait for ever)
+            if event.type != pygame.NOEVENT:
+                arrived = time.perf_counter()
+                events.append((event, arrived))
+                events.extend(self.get_events(arrived))
+
+    def run(self, start):
+        self.switch(start)
+        self.running = True
+        while self.running:
+            scene = self.scene
+            if scene.tick_policy == IDLE:
+                event = pygame.event.wait(self.idle_timeout)
+                arrived = time.perf_counter()
+                events = [] if event.type == pygame.NOEVENT else [(event, arrived)] + self.get_events(arrived)
+                frame_time = self.clock.tick() / 1000
+            elif self.latency is not None:
+                events = self.wait_frame()
+                frame_time = self.clock.tick() / 1000
+            else:
+                frame_time = self.clock.tick(self.fps) / 1000
+                events = self.get_events(time.perf_counter())
+            frame_time = min(frame_time, self.max_frame_time)
+            self.frame_start = time.perf_counter()
+
+            self.switched = False
+            for event, arrived in coalesce_motion(events):
+                if event.type == pygame.QUIT:
+                    self.running = False
+                if self.on_event is not None:
+                    self.on_event(event)
+                if self.latency is not None:
+                    self.latency.consume(self.name, event, arrived)
+                self.scene.handle(event)
+            if not self.running:
+                break
+            if self.switched:
+                frame_time = 0.0  # time spent on the last scene (like sitting paused) doesn't count for this one
+            if self.before_frame is not None:
+                self.before_frame()
+            self.scene.update(frame_time)
+            if self.drawing:
+                self.scene.draw()
+            if self.latency is not None:
+                self.latency.end_frame()
@@ -0,0 +1,102 @@
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS  # 64 slots per level
+SLOT_MASK = SLOTS - 1
+LEVELS = 4  # 64 ** 4 ticks (about 3 days at 60 ticks/s) before the overflow list
+
+
+class TimingWheel:
+    # Hierarchical timing wheel for things that should happen on a given
+    # tick (spawns, hiding the hint, popups running out, ...). Scheduling
+    # is O(1) and each tick only touches the events due on it, however
+    # many are waiting further ahead.
+    #
+    # Level 0 has one slot per tick for the next 64 ticks. Level 1 has one
+    # slot per 64 ticks, level 2 per 64 * 64 ticks and so on. An event goes
+    # in the lowest level whose slot covers it, picked by the highest 6 bit
+    # group in which its tick differs from now. Whenever a level's slots
+    # wrap round, the next slot up is emptied and its events are placed
+    # again ("cascaded"), landing a level lower each time until they reach
+    # level 0 and fire.
+    #
+    # Events are plain (tick, event) pairs. There's no cancel: like the
+    # expiry heap, whoever handles an event checks whether it still applies.
+
+    def __init__(self, now=0):
+        self.now = now  # last tick advanced to
+        self.wheels = [[[] for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self.overflow = []  # too far ahead even for the top level
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    # Run event at tick (anything not in the future runs next tick).
+    # Several events can share a tick, they come out in the order added.
+    def schedule(self, tick, event):
+        self.place(max(tick, self.now + 1), event)
+        self.size += 1
+
+    def place(self, tick, event):
+        # (tick == now happens while cascading, it's due right now)
+        level = max(0, (tick ^ self.now).bit_length() - 1) // SLOT_BITS
+        if level >= LEVELS:
+            self.overflow.append((tick, event))
+        else:
+            self.wheels[level][(tick >> (level * SLOT_BITS)) & SLOT_MASK].append((tick, event))
+
+    # Move on one tick, returns the events due on it
+    def advance(self):
+        self.now += 1
+        now = self.now
+
+        # Cascade, top level first, every level whose slot just wrapped
+        level = 0
+        while level < LEVELS and (now >> ((level + 1) * SLOT_BITS) << ((level + 1) * SLOT_BITS)) == now:
+            level += 1
+        if level == LEVELS:
+            waiting, self.overflow = self.overflow, []
+            for tick, event in waiting:
+                self.place(tick, event)
+            level -= 1
+        for level in range(level, 0, -1):
+            slots = self.wheels[level]
+            slot = (now >> (level * SLOT_BITS)) & SLOT_MASK
+            waiting, slots[slot] = slots[slot], []
+            for tick, event in waiting:
+                self.place(tick, event)
+
+        slots = self.wheels[0]
+        due, slots[now & SLOT_MASK] = slots[now & SLOT_MASK], []
+        self.size -= len(due)
+        return [event for _, event in due]
+
+    # Tick of the earliest waiting event, or None. Only looks at slots up
+    # to the first one in use on each level.
+    def next_tick(self):
+        if self.size == 0:
+            return None
+        for level in range(LEVELS):
+            slots = self.wheels[level]
+            start = (self.now >> (level * SLOT_BITS)) & SLOT_MASK
+            if level == 0:
+                start += 1  # the slot for now has already fired
+            for slot in range(start, SLOTS):
+                if slots[slot]:
+                    return min(tick for tick, _ in slots[slot])
+        return min(tick for tick, _ in self.overflow)
+
+    # Jump straight to tick, which must be before next_tick(). Everything
+    # waiting is placed again relative to the new now.
+    def skip_to(self, tick):
+        if tick <= self.now:
+            return
+        waiting = self.overflow
+        for slots in self.wheels:
+            for slot in range(SLOTS):
+                if slots[slot]:
+                    waiting.extend(slots[slot])
+                    slots[slot] = []
+        self.overflow = []
+        self.now = tick
+        for due, event in waiting:
+            self.place(due, event)
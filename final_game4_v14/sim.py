@@ -0,0 +1,465 @@
+import heapq
+import random
+import numpy as np
+
+from blocks import BlockStore, NORMAL, SPECIAL, TYPE_NAMES
+from conveyor import BinConveyor
+from scheduler import TimingWheel
+from spawner import Spawner
+from popups import PopupPool
+from spatial import SpatialGrid
+
+# Gameplay constants (test.py imports these too)
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+# All speeds are per second and all delays are in seconds, the sim turns
+# them into per-tick amounts. The sim always runs TICK_RATE ticks per
+# second of game time, no matter how fast the screen is redrawn.
+TICK_RATE = 60  # simulation ticks per second
+TICK = 1 / TICK_RATE  # seconds per tick
+BIN_SPEED = 60  # pixels per second
+BLOCK_WIDTH = 40
+BLOCK_HEIGHT = 40
+BLOCK_SPEED = 60 # pixels per second
+SPECIAL_SPEED_FACTOR = 1.7  # special plastic falls 70% faster
+SPAWN_DELAY = 1.5  # seconds (decrease/increase for less/more plastic)
+CONVEYOR_HEIGHT = 20
+BIN_WIDTH = 60
+BIN_HEIGHT = 60
+MAX_BINS = 3 # any number, the conveyor gets longer than the screen if they don't fit
+BIN_SPACING = 2 * BIN_WIDTH  # least distance between bins' left edges
+BIN_Y = SCREEN_HEIGHT - CONVEYOR_HEIGHT - BIN_HEIGHT  # all bins sit on the conveyor
+# extra block constants for levels mode
+BASE_BLOCK_SPEED = 60  # pixels per second
+BASE_SPAWN_DELAY = 1.5  # seconds
+SPEED_INCREMENT = 18  # pixels per second faster each level
+SPAWN_DECREMENT = 1 / 12  # seconds less between spawns each level
+MIN_SPAWN_DELAY = 1 / 6  # seconds
+# Past the level where the delay hits MIN_SPAWN_DELAY (endurance levels)
+# blocks come this many more per second each level (a straight line, so it
+# stays playable), up to the spawner's MAX_SPAWNS_PER_TICK
+ENDURANCE_SPAWN_STEP = 0.6
+LEVEL_SCORE_GOAL = 5000
+LEVEL_UP_LIVES = 3  # extra lives for reaching the next level
+START_LIVES = {"levels": 3, "freeplay": 6}
+NORMAL_POINTS = 100
+SPECIAL_POINTS = 250
+# popups and the start-of-game hint
+HINT_DURATION = 3.0  # seconds
+FLOAT_TEXT_DURATION = 1 / 3  # seconds a "+100" stays up
+FLOAT_TEXT_RISE = 60  # pixels per second
+LEVEL_UP_TEXT_DURATION = 1.5  # seconds
+
+
+# Convert a duration in seconds into a whole number of ticks (at least 1)
+def seconds_to_ticks(seconds):
+    return max(1, round(seconds * TICK_RATE))
+
+
+# First tick after t0 at which a block that was at y0 at tick t0, moving
+# vy pixels per tick, is below `line` (y > line). Works on arrays too.
+def crossing_tick(y0, vy, t0, line=SCREEN_HEIGHT):
+    return t0 + np.floor((line - y0) / vy).astype(np.int64) + 1
+
+
+# Pixels a block falls per tick (no rounding, positions are exact floats)
+def fall_step(speed):
+    return speed * TICK
+
+
+class Simulation:
+    # All the gameplay for one game (spawning, falling, bins, collisions,
+    # lives and levels). step() advances one fixed tick (TICK seconds) of
+    # game time and nothing in here draws, so it runs fine with no display.
+
+    def __init__(self, game_mode="freeplay", seed=None):
+        self.rng = random.Random(seed)
+        self.game_mode = game_mode  # "levels" or "freeplay"
+        self.tick = 0
+        self.points = 0
+        self.lives = START_LIVES[game_mode]
+        self.current_level = 1
+        self.game_over = False
+
+        self.blocks = BlockStore()
+        self.grid = SpatialGrid()  # blocks, by slot index
+        # Blocks fall at a fixed speed, so the tick each one drops off the
+        # screen is known when it spawns. expiry is a min-heap of
+        # (tick, handle); entries whose tick no longer matches the block's
+        # expires column (collected, grabbed, re-speeded) are just skipped.
+        self.expiry = []
+        self.conveyor = BinConveyor(MAX_BINS, self.rng, SCREEN_WIDTH, BIN_WIDTH, BIN_HEIGHT, BIN_Y, BIN_SPACING,
+                                    BIN_SPEED * TICK)
+        self.spawner = Spawner(self.rng.getrandbits(64), SCREEN_WIDTH - BLOCK_WIDTH, SPAWN_DELAY * TICK_RATE)
+
+        # Drag and drop state (dragging_block is a BlockStore handle, it
+        # stays safe to hold even after the block is collected or lost)
+        self.dragging_block = None
+        self.drag_offset_x = 0
+        self.drag_offset_y = 0
+
+        self.block_speed = None
+        self.modifiers_level = None  # current_level the speed and spawn gap are set for
+        self.update_level_modifiers()
+
+        # Everything that happens after a set time (spawns, hiding the
+        # hint) is an event in the timing wheel, so a tick only deals with
+        # what's due on it
+        self.scheduler = TimingWheel()
+        self.scheduler.schedule(self.spawner.next_tick(), ("spawn",))
+        self.hint_visible = True  # "Use mouse to drag and drop plastic..."
+        self.scheduler.schedule(seconds_to_ticks(HINT_DURATION), ("hide_hint",))
+
+        # Score and level up popups (capped, the oldest go first)
+        self.popups = PopupPool()
+
+        # things that happened during the last step, for sounds and popups
+        # ("collect", block_type, x, y), ("life_lost",), ("level_up", level), ("game_over",)
+        self.events = []
+
+    # Current level modifiers
+    def update_level_modifiers(self):
+        self.modifiers_level = self.current_level
+        if self.game_mode == "levels":
+            block_speed = BASE_BLOCK_SPEED + (self.current_level - 1) * SPEED_INCREMENT
+            self.spawn_delay = BASE_SPAWN_DELAY - (self.current_level - 1) * SPAWN_DECREMENT
+            if self.spawn_delay < MIN_SPAWN_DELAY:
+                levels_past = (MIN_SPAWN_DELAY - self.spawn_delay) / SPAWN_DECREMENT
+                self.spawn_delay = 1 / (1 / MIN_SPAWN_DELAY + levels_past * ENDURANCE_SPAWN_STEP)
+        else:
+            block_speed = BLOCK_SPEED
+            self.spawn_delay = SPAWN_DELAY
+        self.spawner.set_interval(self.spawn_delay * TICK_RATE)
+
+        # the speed applies to blocks already falling too, so restart their
+        # fall from where they are now
+        if block_speed != self.block_speed:
+            self.block_speed = block_speed
+            blocks = self.blocks
+            falling = self.falling()
+            blocks.rebase(falling, self.tick)
+            blocks.vy[falling] = np.where(blocks.type[falling] == SPECIAL, self.fall_step(SPECIAL), self.fall_step(NORMAL))
+            self.rebuild_expiry()
+
+    # pixels per tick for a block type at the current speed
+    def fall_step(self, block_type):
+        if block_type == SPECIAL:
+            return fall_step(self.block_speed * SPECIAL_SPEED_FACTOR)  # faster special plastic
+        return fall_step(self.block_speed)
+
+    # Topmost block under a point, or None. Only blocks filed in the grid
+    # cell under the point are looked at.
+    def block_at(self, pos):
+        near = self.grid.query_point(*pos)
+        if not near:
+            return None
+        return self.blocks.topmost_at(np.fromiter(near, dtype=np.intp), pos, BLOCK_WIDTH, BLOCK_HEIGHT)
+
+    # Slot index of the dragged block, or None
+    def dragged_index(self):
+        if self.dragging_block is None:
+            return None
+        return self.blocks.index(self.dragging_block)
+
+    # Slots of every live block that isn't being held
+    def falling(self):
+        falling = self.blocks.live()
+        dragged = self.dragged_index()
+        if dragged is not None:
+            falling = falling[falling != dragged]
+        return falling
+
+    def grab(self, pos):
+        i = self.block_at(pos)
+        if i is None:
+            return False
+        self.dragging_block = self.blocks.handle(i)
+        self.hint_visible = False  # hide hint immediately when player interacts
+        # held blocks stop falling (and can't fall off)
+        self.blocks.rebase(i, self.tick)
+        self.blocks.vy[i] = 0.0
+        self.blocks.expires[i] = -1
+        self.drag_offset_x = pos[0] - self.blocks.x[i]
+        self.drag_offset_y = pos[1] - self.blocks.y[i]
+        return True
+
+    def drag_to(self, pos):
+        i = self.dragged_index()
+        if i is None:
+            return
+        new_x = pos[0] - self.drag_offset_x
+        new_y = pos[1] - self.drag_offset_y
+
+        # Clamp within game window
+        new_x = min(max(new_x, 0), SCREEN_WIDTH - BLOCK_WIDTH)
+        new_y = min(max(new_y, 0), SCREEN_HEIGHT - BLOCK_HEIGHT)
+
+        self.blocks.place(i, new_x, new_y, self.tick)
+        self.refile_block(i)
+
+    # let go of plastic
+    def release(self):
+        i = self.dragged_index()
+        self.dragging_block = None
+        if i is not None:
+            # falling again from wherever it was dropped
+            self.blocks.vy[i] = self.fall_step(self.blocks.type[i])
+            self.blocks.t0[i] = self.tick
+            self.schedule_expiry(i)
+
+    def step(self):
+        self.events = []
+        if self.game_over:
+            return
+        self.tick += 1
+
+        blocks = self.blocks
+
+        # Whatever is due this tick. There can be several spawns at once.
+        for event in self.scheduler.advance():
+            kind = event[0]
+            if kind == "spawn":
+                # Spawn blocks every spawn_delay seconds
+                self.spawn_due_blocks()
+                self.scheduler.schedule(self.spawner.next_tick(), ("spawn",))
+            elif kind == "hide_hint":
+                self.hint_visible = False
+        self.popups.expire(self.tick)
+
+        # Where everything is at this tick (bins and blocks both just follow
+        # their formula, the dragged block has vy 0 so it stays put)
+        blocks.update_y(self.tick)
+        self.conveyor.set_tick(self.tick)
+        self.refile_fallen_blocks()
+
+        # Check for block-bin collisions. Bins all sit on one row, so only
+        # blocks filed in the grid cells along that row can touch one, and
+        # for those the conveyor finds the bin under each block with a
+        # binary search instead of trying every bin.
+        near = self.grid.query(self.grid.span(0, BIN_Y, SCREEN_WIDTH, BIN_HEIGHT))
+        if near:
+            near = np.fromiter(near, dtype=np.intp)
+            near = near[blocks.alive[near] & (blocks.y[near] < BIN_Y + BIN_HEIGHT) & (blocks.y[near] + BLOCK_HEIGHT > BIN_Y)]
+            hit_bins = self.conveyor.first_hit(blocks.x[near], BLOCK_WIDTH)
+            bin_xs = self.conveyor.xs()
+            for i, b in zip(near[hit_bins >= 0].tolist(), hit_bins[hit_bins >= 0].tolist()):
+                if blocks.type[i] == SPECIAL:
+                    self.points += SPECIAL_POINTS
+                else:
+                    self.points += NORMAL_POINTS
+                block_type = TYPE_NAMES[blocks.type[i]]
+                x = bin_xs[b] + BIN_WIDTH / 2
+                self.events.append(("collect", block_type, x, BIN_Y))
+                self.add_popup(block_type, f"+{SPECIAL_POINTS if block_type == 'special' else NORMAL_POINTS}",
+                               x, BIN_Y - 20, FLOAT_TEXT_DURATION, FLOAT_TEXT_RISE)
+                self.remove_block(i)
+
+        # Lose life if block falls off screen. Only blocks whose exit tick
+        # has come up are looked at.
+        while self.expiry and self.expiry[0][0] <= self.tick:
+            expires, handle = heapq.heappop(self.expiry)
+            i = blocks.index(handle)
+            if i is None or blocks.expires[i] != expires:
+                continue  # stale entry
+            self.remove_block(i)
+            self.lives -= 1
+            self.events.append(("life_lost",))
+            if self.lives <= 0 and not self.game_over:
+                self.game_over = True  # Trigger game over
+                self.events.append(("game_over",))
+
+        self.update_level_modifiers()
+
+        # Level progression (if on levels)
+        if self.game_mode == "levels" and self.points >= self.current_level * LEVEL_SCORE_GOAL:
+            self.current_level += 1
+            self.lives += LEVEL_UP_LIVES  # give 3 more lives for next level
+            self.events.append(("level_up", self.current_level))
+            self.add_popup("level_up", f"Level {self.current_level}!", SCREEN_WIDTH / 2, SCREEN_HEIGHT / 3,
+                           LEVEL_UP_TEXT_DURATION)
+
+    # Run up to `ticks` ticks. Stretches where nothing but falling and
+    # scrolling happens (no spawn, no block near the bins, nothing falling
+    # off) are jumped over in one go, since positions don't need stepping.
+    # Ends in the same state as calling step() that many times, but events
+    # only hold what happened on the last tick that was actually stepped.
+    def fast_forward(self, ticks):
+        end = self.tick + ticks
+        while self.tick < end and not self.game_over:
+            quiet_until = min(end, self.next_event_tick() - 1)
+            if quiet_until > self.tick:
+                self.events = []
+                self.scheduler.skip_to(quiet_until)
+                self.tick = quiet_until
+                self.popups.expire(self.tick)
+                self.blocks.update_y(self.tick)
+                self.conveyor.set_tick(self.tick)
+                self.refile_fallen_blocks()
+            else:
+                self.step()
+
+    # Earliest tick at which step() might do more than move things: the
+    # next scheduled event, the next block off screen, or the next block
+    # reaching the bins' row. A block already level with the bins (or one
+    # being dragged, or a level up whose new speed step() hasn't put in
+    # yet) means the very next tick.
+    def next_event_tick(self):
+        if self.modifiers_level != self.current_level:
+            return self.tick + 1
+        next_tick = self.scheduler.next_tick()
+        if next_tick is None:
+            next_tick = self.tick + TICK_RATE * 60 * 60  # nothing scheduled, just don't skip forever
+        if self.expiry:
+            next_tick = min(next_tick, self.expiry[0][0])
+        if self.dragging_block is not None:
+            return self.tick + 1
+
+        blocks = self.blocks
+        live = blocks.live()
+        if len(live):
+            ys = blocks.y[live]
+            if ((ys + BLOCK_HEIGHT > BIN_Y) & (ys < BIN_Y + BIN_HEIGHT)).any():
+                return self.tick + 1
+            above = live[ys + BLOCK_HEIGHT <= BIN_Y]
+            if len(above):
+                reach = crossing_tick(blocks.y0[above], blocks.vy[above], blocks.t0[above], BIN_Y - BLOCK_HEIGHT)
+                next_tick = min(next_tick, int(reach.min()))
+        return next_tick
+
+    # Blocks only fall, so only the row of cells they're filed under can
+    # change. Work out the new rows for everyone in one go and refile just
+    # the few that crossed a cell boundary.
+    def refile_fallen_blocks(self):
+        blocks = self.blocks
+        n = blocks.count
+        cell_size = self.grid.cell_size
+        cell_y0 = (blocks.y[:n] // cell_size).astype(np.int32)
+        cell_y1 = ((blocks.y[:n] + BLOCK_HEIGHT) // cell_size).astype(np.int32)
+        crossed = (blocks.alive[:n] & ((cell_y0 != blocks.cell_y0[:n]) | (cell_y1 != blocks.cell_y1[:n]))).nonzero()[0]
+        if len(crossed):
+            old_spans = zip(blocks.cell_x0[crossed].tolist(), blocks.cell_y0[crossed].tolist(),
+                            blocks.cell_x1[crossed].tolist(), blocks.cell_y1[crossed].tolist())
+            new_rows = zip(cell_y0[crossed].tolist(), cell_y1[crossed].tolist())
+            for i, (x0, y0, x1, y1), (new_y0, new_y1) in zip(crossed.tolist(), old_spans, new_rows):
+                self.grid.move(i, (x0, y0, x1, y1), (x0, new_y0, x1, new_y1))
+            blocks.cell_y0[crossed] = cell_y0[crossed]
+            blocks.cell_y1[crossed] = cell_y1[crossed]
+
+    # Where a block is at any tick (default now), straight from its fall
+    # formula, or None if the block is gone. O(1) however far ahead.
+    def block_position(self, handle, tick=None):
+        i = self.blocks.index(handle)
+        if i is None:
+            return None
+        if tick is None:
+            tick = self.tick
+        return float(self.blocks.x[i]), float(self.blocks.ys_at(i, tick))
+
+    # Screen x of bin b at any tick (default now)
+    def bin_x(self, b, tick=None):
+        if tick is None:
+            tick = self.tick
+        return float(self.conveyor.xs(self.conveyor.scroll_at(tick))[b])
+
+    # Positions at a point between the last tick and this one, alpha is
+    # how far (0-1) the renderer is into the next tick. Returns (types, xs,
+    # ys) arrays for the live blocks, oldest first.
+    def interpolated_blocks(self, alpha, skip_held=False):
+        blocks = self.blocks
+        live = blocks.live_by_order()
+        held = self.dragged_index() if skip_held else None
+        if held is not None:
+            live = live[live != held]  # drawn on its own, see held_block()
+        t = self.tick - 1 + alpha
+        # a block dropped this tick hasn't started falling again yet
+        ys = blocks.y0[live] + blocks.vy[live] * np.maximum(t - blocks.t0[live], 0)
+        return blocks.type[live], blocks.x[live], ys
+
+    # (type, x, y) of the block being dragged, None if there isn't one
+    def held_block(self):
+        i = self.dragged_index()
+        if i is None:
+            return None
+        return int(self.blocks.type[i]), float(self.blocks.x[i]), float(self.blocks.y[i])
+
+    # Yields (x, y) for each bin on screen
+    def interpolated_bins(self, alpha):
+        conveyor = self.conveyor
+        scroll = conveyor.scroll_at(self.tick - 1 + alpha)
+        xs = conveyor.xs(scroll)
+        for b in conveyor.visible(scroll):
+            yield xs[b], BIN_Y
+
+    # Popups drift up rise pixels per second from (x, y), text centered on
+    # x, and disappear after duration seconds
+    def add_popup(self, kind, text, x, y, duration, rise=0):
+        # like a new block it has already moved once by the end of this tick
+        return self.popups.add(kind, text, x, y, self.tick - 1, rise * TICK, self.tick + seconds_to_ticks(duration))
+
+    # (kinds, text ids, xs, ys) arrays for the popups, oldest first,
+    # blended like the blocks. Kinds index POPUP_KINDS and text ids index
+    # popups.texts.
+    def interpolated_popups(self, alpha):
+        return self.popups.positions_at(self.tick - 1 + alpha)
+
+    # How far the conveyor belt has moved, blended like the bins (for
+    # drawing the belt itself)
+    def interpolated_belt(self, alpha):
+        return self.conveyor.travel_at(self.tick - 1 + alpha)
+
+    # Spawn every block the spawner has due this tick, all in one batch
+    def spawn_due_blocks(self):
+        xs, rolls, times = self.spawner.due(self.tick)
+        # 10% chance for special plastic
+        # Increase special plastic chance with level
+        special_chance = min(0.1 + (self.current_level - 1) * 0.05, 0.5)  # caps at 50%
+        types = np.where(rolls < special_chance, SPECIAL, NORMAL)
+        # A block spawned partway through the tick has already fallen a bit
+        # by the end of it, so blocks from the same tick don't come out in
+        # a flat line
+        vys = np.where(types == SPECIAL, self.fall_step(SPECIAL), self.fall_step(NORMAL))
+        return self.spawn_blocks(xs, -BLOCK_HEIGHT + vys * (self.tick - times), types)
+
+    # New blocks at (xs, ys) as of the end of last tick, so they move for
+    # the first time this tick. Returns their slots.
+    def spawn_blocks(self, xs, ys, types):
+        blocks = self.blocks
+        vys = np.where(types == SPECIAL, self.fall_step(SPECIAL), self.fall_step(NORMAL))
+        slots = blocks.add_many(xs, ys, types, vys, self.tick - 1)
+        for i, x, y in zip(slots.tolist(), xs.tolist(), ys.tolist()):
+            span = self.grid.span(x, y, BLOCK_WIDTH, BLOCK_HEIGHT)
+            blocks.set_span(i, span)
+            self.grid.insert(i, span)
+        expires = crossing_tick(blocks.y0[slots], vys, self.tick - 1)
+        blocks.expires[slots] = expires
+        for expiry in zip(expires.tolist(), blocks.handles(slots).tolist()):
+            heapq.heappush(self.expiry, expiry)
+        return slots
+
+    def schedule_expiry(self, i):
+        blocks = self.blocks
+        expires = int(crossing_tick(blocks.y0[i], blocks.vy[i], blocks.t0[i]))
+        blocks.expires[i] = expires
+        heapq.heappush(self.expiry, (expires, blocks.handle(i)))
+
+    # Every falling block's exit tick changes when the speed does
+    def rebuild_expiry(self):
+        blocks = self.blocks
+        falling = self.falling()
+        expires = crossing_tick(blocks.y0[falling], blocks.vy[falling], blocks.t0[falling])
+        blocks.expires[falling] = expires
+        self.expiry = list(zip(expires.tolist(), blocks.handles(falling).tolist()))
+        heapq.heapify(self.expiry)
+
+    # Move block i to the grid cells matching its current position
+    def refile_block(self, i):
+        blocks = self.blocks
+        span = self.grid.span(blocks.x[i], blocks.y[i], BLOCK_WIDTH, BLOCK_HEIGHT)
+        self.grid.move(i, blocks.span(i), span)
+        blocks.set_span(i, span)
+
+    def remove_block(self, i):
+        self.grid.remove(i, self.blocks.span(i))
+        self.blocks.remove(i)
+        if self.dragging_block is not None and self.blocks.index(self.dragging_block) is None:
+            self.dragging_block = None
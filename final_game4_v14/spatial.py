@@ -0,0 +1,67 @@
+CELL_SIZE = 80  # pixels, twice a block so a block covers at most 2x2 cells
+
+
+class SpatialGrid:
+    # Uniform grid over the play area. Each cell keeps the set of ids of
+    # whatever overlaps it, so "what is near this rect/point" only looks at
+    # a few cells instead of every object.
+    #
+    # The grid doesn't remember where things are: callers keep each id's
+    # span (the cells it covers, from span()) and hand back the old one when
+    # an object moves, so a move that stays in the same cells costs nothing.
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}  # (cell_x, cell_y) -> set of ids
+
+    # (first cell x, first cell y, last cell x, last cell y) covered by a rect
+    def span(self, x, y, width, height):
+        size = self.cell_size
+        return (int(x // size), int(y // size), int((x + width) // size), int((y + height) // size))
+
+    def span_cells(self, span):
+        x0, y0, x1, y1 = span
+        for cell_y in range(y0, y1 + 1):
+            for cell_x in range(x0, x1 + 1):
+                yield cell_x, cell_y
+
+    def insert(self, item, span):
+        x0, y0, x1, y1 = span
+        cells = self.cells
+        for cell_y in range(y0, y1 + 1):
+            for cell_x in range(x0, x1 + 1):
+                items = cells.get((cell_x, cell_y))
+                if items is None:
+                    cells[cell_x, cell_y] = {item}
+                else:
+                    items.add(item)
+
+    def remove(self, item, span):
+        x0, y0, x1, y1 = span
+        cells = self.cells
+        for cell_y in range(y0, y1 + 1):
+            for cell_x in range(x0, x1 + 1):
+                items = cells.get((cell_x, cell_y))
+                if items is not None:
+                    items.discard(item)
+                    if not items:
+                        del cells[cell_x, cell_y]
+
+    def move(self, item, old_span, new_span):
+        if old_span != new_span:
+            self.remove(item, old_span)
+            self.insert(item, new_span)
+
+    # Every id in the cells a span covers (may include things that are
+    # near but not actually overlapping, callers do the exact test)
+    def query(self, span):
+        found = set()
+        for cell in self.span_cells(span):
+            items = self.cells.get(cell)
+            if items:
+                found |= items
+        return found
+
+    # Ids in the cell under a point (the grid's own set, don't modify it)
+    def query_point(self, x, y):
+        return self.cells.get((int(x // self.cell_size), int(y // self.cell_size)), set())
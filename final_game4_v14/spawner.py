@@ -0,0 +1,58 @@
+import math
+import numpy as np
+
+CHUNK = 256  # spawn positions and type rolls drawn ahead at a time
+MAX_SPAWNS_PER_TICK = 2  # however short the interval asked for, it never goes under 1 / this
+
+
+class Spawner:
+    # Works out when blocks spawn and where. Spawns are interval ticks
+    # apart, and the interval can be any fraction of a tick, so at high
+    # levels several blocks come out on the same tick. next_time is the
+    # exact (fractional) tick of the next spawn and carries the leftover
+    # from one tick to the next, so the average rate is spot on.
+    #
+    # Spawn x positions and the random numbers that pick each block's type
+    # are drawn CHUNK at a time with numpy rather than one call per block.
+
+    def __init__(self, seed, x_max, interval):
+        self.gen = np.random.default_rng(seed)
+        self.x_max = x_max  # spawn xs are 0..x_max inclusive
+        self.interval = None  # ticks between spawns
+        self.set_interval(interval)
+        self.next_time = float(self.interval)
+        self.xs = np.zeros(0, dtype=np.int64)
+        self.rolls = np.zeros(0)
+        self.used = 0
+
+    # New gap between spawns (ticks, fractions are fine, but no shorter
+    # than 1 / MAX_SPAWNS_PER_TICK). The spawn already lined up keeps its
+    # time, the new gap counts from there.
+    def set_interval(self, interval):
+        self.interval = max(interval, 1 / MAX_SPAWNS_PER_TICK)
+
+    # First tick with a spawn on it
+    def next_tick(self):
+        return math.ceil(self.next_time)
+
+    # Every spawn up to and including tick. Returns (xs, rolls, times):
+    # positions, a 0-1 random number each for picking the type, and the
+    # exact time of each spawn (between tick - 1 and tick).
+    def due(self, tick):
+        if self.next_time > tick:
+            return self.take(0) + (np.zeros(0),)
+        count = int((tick - self.next_time) // self.interval) + 1
+        times = self.next_time + np.arange(count) * self.interval
+        self.next_time += count * self.interval
+        return self.take(count) + (times,)
+
+    # The next count precomputed xs and rolls
+    def take(self, count):
+        if self.used + count > len(self.xs):
+            more = max(CHUNK, count)
+            self.xs = np.concatenate((self.xs[self.used:], self.gen.integers(0, self.x_max + 1, more)))
+            self.rolls = np.concatenate((self.rolls[self.used:], self.gen.random(more)))
+            self.used = 0
+        start = self.used
+        self.used += count
+        return self.xs[start:self.used], self.rolls[start:self.used]
@@ -1,434 +1,562 @@
-import pygame
-import sys
-import random  # ADDED: for random block positions
-import os # for keeping track of highscore
-
-# Freeplay high score
-if os.path.exists("highscore.txt"):
-    with open("highscore.txt", "r") as f:
-        high_score = int(f.read().strip() or 0)
-else:
-    high_score = 0
-
-# Levels highest points
-if os.path.exists("highest_level_points.txt"):
-    with open("highest_level_points.txt", "r") as f:
-        highest_level_points = int(f.read().strip() or 0)
-else:
-    highest_level_points = 0
-
-# Initialize Pygame
-pygame.init()
-
-# Music and Sound
-pygame.mixer.init()
-effect_sound = pygame.mixer.Sound("effect.mp3")
-effect_sound.set_volume(0.3)
-
-# Constants
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
-button_color = (0, 100, 200)
-button_fill_color = (0, 100, 200)
-button_border_color = (100, 150, 255)
-BIN_COLOR = (255, 200, 0)
-floating_texts = []
-BIN_SPEED = 1  # pixels per frame
-BLOCK_WIDTH = 40
-BLOCK_HEIGHT = 40
-BLOCK_COLOR = (200, 200, 255)
-BLOCK_SPEED = 1 # must be >1
-SPAWN_DELAY = 90  # frames (60fps = 1 second, decrease/increase for less/more plastic)
-CONVEYOR_HEIGHT = 20
-BIN_WIDTH = 60
-BIN_HEIGHT = 60
-MAX_BINS = 3 # max of 8
-HINT_DURATION_FRAMES = 180  # ~3 seconds at 60 FPS
-# extra block constants for levels mode
-BASE_BLOCK_SPEED = 1
-BASE_SPAWN_DELAY = 90
-SPEED_INCREMENT = 0.3
-SPAWN_DECREMENT = 5 
-
-# Create the game window
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Plastic Collector Game")
-
-# Load background image
-background = pygame.image.load("background_ocean.jpg").convert()
-background = pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT))
-
-# Font setup
-title_font = pygame.font.SysFont(None, 64)
-sub_font = pygame.font.SysFont(None, 36)
-button_font = pygame.font.SysFont(None, 48)
-hud_font = pygame.font.SysFont(None, 36)
-game_over_font = pygame.font.SysFont(None, 72)
-font_float = pygame.font.SysFont(None, 36)
-
-# Game state
-on_title_screen = True
-
-# Score system
-points = 0
-lives = 6
-
-# Add mode and level variables
-game_mode = None  # None, "levels", or "freeplay"
-current_level = 1
-level_score_goal = 5000
-level_lives = 3
-
-# Home screen buttons
-play_levels_text = button_font.render("Play (Levels)", True, (255,255,255))
-play_levels_rect = play_levels_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 40))
-free_play_text = button_font.render("Free Play", True, (255,255,255))
-free_play_rect = free_play_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 40))
-
-# Generate bins at random positions
-def spawn_bins():
-    bins = []
-    used_positions = []
-    while len(bins) < MAX_BINS:
-        x = random.randint(0, SCREEN_WIDTH - BIN_WIDTH)
-        # avoid overlapping bins too much
-        if all(abs(x - ux) > BIN_WIDTH for ux in used_positions):
-            used_positions.append(x)
-            bin_rect = pygame.Rect(x, SCREEN_HEIGHT - CONVEYOR_HEIGHT - BIN_HEIGHT, BIN_WIDTH, BIN_HEIGHT)
-            bins.append(bin_rect)
-    return bins
-
-bins = spawn_bins()
-
-# Placeholder block data
-falling_blocks = []  # list of pygame.Rect
-spawn_timer = 0
-clock = pygame.time.Clock()
-
-# Drag and drop plastic text
-show_hint = False
-hint_timer = 0
-
-# Drag and drop state
-dragging_block = None
-drag_offset_x = 0
-drag_offset_y = 0
-
-game_over = False  # Flag to control game over state
-
-# ADDED: function to reset game
-def reset_game():
-    global falling_blocks, spawn_timer, points, lives, bins, on_title_screen, game_over
-    falling_blocks = []
-    spawn_timer = 0
-    points = 0
-    lives = 6
-    bins = spawn_bins()
-    on_title_screen = True
-    game_over = False
-    paused = False
-
-# Load images
-plastic_img = pygame.image.load("plastic.png").convert_alpha()
-special_plastic_img = pygame.image.load("special_plastic.png").convert_alpha()
-special_plastic_img = pygame.transform.scale(special_plastic_img, (BLOCK_WIDTH, BLOCK_HEIGHT))
-bin_img = pygame.image.load("bin.png").convert_alpha()
-
-# Resize images if needed
-plastic_img = pygame.transform.scale(plastic_img, (BLOCK_WIDTH, BLOCK_HEIGHT))
-bin_img = pygame.transform.scale(bin_img, (BIN_WIDTH, BIN_HEIGHT))  # adjust BIN_WIDTH & BIN_HEIGHT
-
-
-# Game loop
-paused = False
-game_started = False
-
-running = True
-while running:
-    clock.tick(60)  # limit to 60fps
-
-    # Event handling
-    
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_p and not on_title_screen:
-                paused = not paused
-                
-        # level buttons
-        if on_title_screen and event.type == pygame.MOUSEBUTTONDOWN:
-            if play_levels_rect.collidepoint(event.pos):
-                game_mode = "levels"
-                lives = 3
-                current_level = 1
-                on_title_screen = False
-                show_hint = True
-                hint_timer = HINT_DURATION_FRAMES
-                game_started = True
-                paused = False
-            elif free_play_rect.collidepoint(event.pos):
-                game_mode = "freeplay"
-                lives = 6
-                on_title_screen = False
-                show_hint = True
-                hint_timer = HINT_DURATION_FRAMES
-                game_started = True
-                paused = False
-
-        elif not on_title_screen and not game_over and not paused:
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                
-                # Check if clicked on any block
-                for block_dict in reversed(falling_blocks):  # Topmost block gets priority
-                    block = block_dict["rect"]
-                    if block.collidepoint(event.pos):
-                        dragging_block = block_dict  # store the whole dict, not just rect
-                        show_hint = False  # hide hint immediately when player interacts
-                        drag_offset_x = event.pos[0] - block.x
-                        drag_offset_y = event.pos[1] - block.y
-                        break
-                    
-            # Mouse drag and drop
-            elif event.type == pygame.MOUSEMOTION and dragging_block:
-                # Update block position
-                new_x = event.pos[0] - drag_offset_x
-                new_y = event.pos[1] - drag_offset_y
-
-                # Clamp within game window
-                if new_x < 0:
-                    new_x = 0
-                elif new_x > SCREEN_WIDTH - BLOCK_WIDTH:
-                    new_x = SCREEN_WIDTH - BLOCK_WIDTH
-
-                if new_y < 0:
-                    new_y = 0
-                elif new_y > SCREEN_HEIGHT - BLOCK_HEIGHT:
-                    new_y = SCREEN_HEIGHT - BLOCK_HEIGHT
-
-                dragging_block["rect"].x = new_x
-                dragging_block["rect"].y = new_y
-
-            # let go of plastic    
-            elif event.type == pygame.MOUSEBUTTONUP:
-                dragging_block = None
-
-
-    # Draw the background
-    screen.blit(background, (0, 0))
-
-    if on_title_screen:
-        # Draw title text
-        title_text = title_font.render("Plastic Collector Game", True, (255, 255, 255))
-        sub_text = sub_font.render("by Jayden Lal", True, (255, 255, 255))
-        screen.blit(title_text, title_text.get_rect(center=(SCREEN_WIDTH // 2, 50)))
-        screen.blit(sub_text, sub_text.get_rect(center=(SCREEN_WIDTH // 2, 110)))
-
-        # Draw buttons with fill and border
-        for rect in [play_levels_rect, free_play_rect]:
-            pygame.draw.rect(screen, button_fill_color, rect.inflate(20, 10))      # fill
-            pygame.draw.rect(screen, button_border_color, rect.inflate(20, 10), 3) # border
-
-        # Draw text on top of buttons
-        screen.blit(play_levels_text, play_levels_rect)
-        screen.blit(free_play_text, free_play_rect)
-
-    elif game_over:
-        # Game over screen
-        screen.fill((0, 0, 0))
-        
-        game_over_text = game_over_font.render("GAME OVER", True, (255, 0, 0))
-        screen.blit(game_over_text, (SCREEN_WIDTH // 2 - game_over_text.get_width() // 2, SCREEN_HEIGHT // 2 - 80))
-        
-        if game_mode == "freeplay":
-            score_text = hud_font.render(f"Final Score: {points}", True, (255, 255, 255))
-            high_score_text = hud_font.render(f"High Score: {high_score}", True, (255, 255, 255))
-            score_y = SCREEN_HEIGHT // 2 - 10
-            level_reached_y = SCREEN_HEIGHT // 2 + 30  # placeholder for hint positioning
-            screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, score_y))
-            screen.blit(high_score_text, (SCREEN_WIDTH // 2 - high_score_text.get_width() // 2, level_reached_y))
-        else:  # levels mode
-            score_text = hud_font.render(f"Final Score: {points}", True, (255, 255, 255))
-            highest_level_text = hud_font.render(f"Highest Level Points: {highest_level_points}", True, (255, 255, 255))
-            level_reached_text = hud_font.render(f"Game Ended on Level {current_level}", True, (255, 255, 255))
-
-            score_y = SCREEN_HEIGHT // 2 - 10
-            highest_level_y = SCREEN_HEIGHT // 2 + 30
-            level_reached_y = SCREEN_HEIGHT // 2 + 70
-
-            screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, score_y))
-            screen.blit(highest_level_text, (SCREEN_WIDTH // 2 - highest_level_text.get_width() // 2, highest_level_y))
-            screen.blit(level_reached_text, (SCREEN_WIDTH // 2 - level_reached_text.get_width() // 2, level_reached_y))
-
-        # Press SPACE hint
-        hint_text = hud_font.render("Press SPACE to continue", True, (200, 200, 200))
-        hint_y = level_reached_y + 40  # always 40px below the last text
-        screen.blit(hint_text, (SCREEN_WIDTH // 2 - hint_text.get_width() // 2, hint_y))
-        
-        pygame.display.flip()
-
-        # Wait for space to continue
-        waiting_for_space = True
-        while waiting_for_space:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                    waiting_for_space = False
-    
-        reset_game()
-
-
-    else:
-        # Gameplay screen
-        
-        # Pause screen
-        if paused and game_started:
-            pause_text = hud_font.render("PAUSED", True, (255, 255, 0))
-            exit_text = hud_font.render("Press ESC to quit to Home", True, (200, 200, 200))
-
-            screen.blit(pause_text,
-                        (SCREEN_WIDTH // 2 - pause_text.get_width() // 2,
-                         SCREEN_HEIGHT // 2 - pause_text.get_height() // 2 - 20))
-            screen.blit(exit_text,
-                        (SCREEN_WIDTH // 2 - exit_text.get_width() // 2,
-                         SCREEN_HEIGHT // 2 - exit_text.get_height() // 2 + 40))
-
-            pygame.display.flip()
-
-            # ESC to exit to home
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_ESCAPE]:
-                reset_game()
-                continue
-
-            continue
-
-        # Spawn blocks every SPAWN_DELAY frames
-        spawn_timer += 1
-        if spawn_timer >= SPAWN_DELAY:
-            x = random.randint(0, SCREEN_WIDTH - BLOCK_WIDTH)
-            # 10% chance for special plastic
-            # Increase special plastic chance with level
-            special_chance = min(0.1 + (current_level - 1) * 0.05, 0.5)  # caps at 50%
-            block_type = "special" if random.random() < special_chance else "normal"
-            falling_blocks.append({"rect": pygame.Rect(x, -BLOCK_HEIGHT, BLOCK_WIDTH, BLOCK_HEIGHT), "type": block_type})
-            spawn_timer = 0
-
-        # Update and draw blocks
-        for block_dict in falling_blocks[:]:
-            block = block_dict["rect"]
-
-            if block_dict != dragging_block:
-                # faster special plastic
-                if block_dict["type"] == "special":
-                    block.y += block_speed * 1.7 # 70% faster for special plastic
-                else:
-                    block.y += block_speed # normal speed
-
-            # draw plastic (different image for special)
-            if block_dict["type"] == "special":
-                screen.blit(special_plastic_img, (block.x, block.y)) #  special image
-            else:
-                screen.blit(plastic_img, (block.x, block.y))
-
-        # Check for block-bin collisions
-        for block_dict in falling_blocks[:]:
-            block = block_dict["rect"]
-            for bin_rect in bins:
-                if block.colliderect(bin_rect):
-                    effect_sound.play()
-                    if block_dict["type"] == "special":
-                        points += 250
-                        floating_texts.append([font_float.render("+250", True, (255, 215, 0)), bin_rect.centerx, bin_rect.top - 20, 20])
-                    else:
-                        points += 100
-                        floating_texts.append([font_float.render("+100", True, (255, 255, 0)), bin_rect.centerx, bin_rect.top - 20, 20])
-                    falling_blocks.remove(block_dict)
-                    break # Stop checking other bins for this block
-
-            # Lose life if block falls off screen
-            if block.y > SCREEN_HEIGHT and block != dragging_block:
-                falling_blocks.remove(block_dict)
-                lives -= 1
-                if lives <= 0:
-                    game_over = True  # Trigger game over
-
-        # Current level modifiers
-        if game_mode == "levels":
-            block_speed = BASE_BLOCK_SPEED + (current_level - 1) * SPEED_INCREMENT
-            spawn_delay = max(10, BASE_SPAWN_DELAY - (current_level - 1) * SPAWN_DECREMENT)
-        else:
-            block_speed = BLOCK_SPEED
-            spawn_delay = SPAWN_DELAY
-
-        # Level progression (if on levels)
-        if game_mode == "levels" and points >= current_level * level_score_goal:
-            current_level += 1
-            lives += 3  # give 3 more lives for next level
-            
-        # Only write highscore in freeplay    
-        if game_mode == "freeplay" and points > high_score:
-            high_score = points
-            with open("highscore.txt", "w") as f:
-                f.write(str(high_score))
-
-        # Only write levels highest points in levels mode
-        if game_mode == "levels" and points > highest_level_points:
-            highest_level_points = points
-            with open("highest_level_points.txt", "w") as f:
-                f.write(str(highest_level_points))
-
-        # Update and draw bins
-        for i, bin_rect in enumerate(bins):
-            bin_rect.x -= BIN_SPEED
-            if bin_rect.right < 0:
-                # Respawn on right
-                bin_rect.x = SCREEN_WIDTH
-            screen.blit(bin_img, (bin_rect.x, bin_rect.y))
-
-        # Draw HUD
-        points_text = hud_font.render(f"Points: {points}", True, (255, 255, 255))
-        lives_text = hud_font.render(f"Lives: {lives}", True, (255, 255, 255))
-        screen.blit(points_text, (10, 10))
-        screen.blit(lives_text, (10, 40))
-
-        # Show the temporary hint at the start of a game
-        if show_hint:
-            hint_text = hud_font.render("Use mouse to drag and drop plastic, p to pause.", True, (255, 255, 255))
-            hint_bg = pygame.Surface((hint_text.get_width() + 20, hint_text.get_height() + 10))
-            hint_bg.set_alpha(120)  # subtle translucent background
-            hint_bg.fill((0, 0, 0))
-            hint_x = (SCREEN_WIDTH - hint_bg.get_width()) // 2
-            hint_y = 110  # under the title area; adjust if you like
-            screen.blit(hint_bg, (hint_x, hint_y))
-            screen.blit(hint_text, (hint_x + 10, hint_y + 5))
-
-            hint_timer -= 1
-            if hint_timer <= 0:
-                show_hint = False
-                
-        # Show current level only in Levels mode
-        if game_mode == "levels":
-            level_text = hud_font.render(f"Level: {current_level}", True, (255, 255, 255))
-            screen.blit(level_text, (10, 70))
-        elif game_mode == "freeplay":
-            high_score_text = hud_font.render(f"High Score: {high_score}", True, (255, 255, 255))
-            screen.blit(high_score_text, (10, 70))
-                    
-        # Draw floating texts
-        for text in floating_texts[:]:
-            screen.blit(text[0], (text[1], text[2]))
-            text[2] -= 1
-            text[3] -= 1       # countdown timer
-            if text[3] <= 0:
-                floating_texts.remove(text)
-
-    # Update display
-    pygame.display.flip()
-
-# Quit
-pygame.quit()
-sys.exit()
+import pygame
+import sys
+import time
+import os # for keeping track of highscore
+from blocks import NORMAL, SPECIAL
+from render import DirtyRenderer, RenderQueue, upscale
+from governor import QualityGovernor
+from lod import LodSelector, find_clusters
+from assets import AssetLoader, build_assets
+from layers import LayerCompositor
+from text import GlyphAtlas
+from popups import POPUP_KINDS
+from ui import Label, Button, Panel, UILayer
+from scenes import Scene, SceneManager, FRAME, IDLE, IDLE_TIMEOUT
+from power import PowerManager, LOW_POWER_FPS
+from latency import LatencyTracker
+from view import Viewport, letterbox, scale_for, snap_scale
+from sim import (Simulation, SCREEN_WIDTH, SCREEN_HEIGHT, BLOCK_WIDTH, BLOCK_HEIGHT,
+                 BIN_WIDTH, BIN_HEIGHT, CONVEYOR_HEIGHT, TICK)
+
+# Freeplay high score
+if os.path.exists("highscore.txt"):
+    with open("highscore.txt", "r") as f:
+        high_score = int(f.read().strip() or 0)
+else:
+    high_score = 0
+
+# Levels highest points
+if os.path.exists("highest_level_points.txt"):
+    with open("highest_level_points.txt", "r") as f:
+        highest_level_points = int(f.read().strip() or 0)
+else:
+    highest_level_points = 0
+
+# Initialize Pygame
+pygame.init()
+
+# Music and Sound
+pygame.mixer.init()
+effect_sound = pygame.mixer.Sound("effect.mp3")
+effect_sound.set_volume(0.3)
+
+# Constants (gameplay constants live in sim.py)
+button_color = (0, 100, 200)
+button_fill_color = (0, 100, 200)
+button_border_color = (100, 150, 255)
+BIN_COLOR = (255, 200, 0)
+BLOCK_COLOR = (200, 200, 255)
+POPUP_COLORS = {"normal": (255, 255, 0), "special": (255, 215, 0), "level_up": (255, 255, 255)}
+RENDER_FPS = 120  # cap on frames drawn per second, the game speed doesn't depend on it
+MAX_FRAME_TIME = 0.25  # seconds, a longer stall is dropped instead of caught up
+DIRTY_RECTS = True  # only redraw what changed during gameplay, False repaints the whole screen every frame
+LATENCY_STATS = False  # print input-to-screen latency percentiles when the game quits
+
+# Create the game window. It can be resized: the game itself works in
+# logical SCREEN_WIDTH x SCREEN_HEIGHT pixels and the viewport (view.py)
+# scales and centers that in the window. F11 toggles fullscreen.
+screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
+pygame.display.set_caption("Plastic Collector Game")
+windowed_size = (SCREEN_WIDTH, SCREEN_HEIGHT)  # to go back to after fullscreen
+fullscreen = False
+RESIZE_DELAY = 0.2  # seconds the window has to stay one size before assets are rebuilt for it
+
+# Load background image
+background_image = pygame.image.load("background_ocean.jpg").convert()
+
+# Images, resized and packed into one atlas surface (cached in
+# .atlas_cache so later runs skip the scaling). Sizes are logical, they
+# get multiplied by the window's scale.
+SPRITES = {
+    "plastic": ("plastic.png", (BLOCK_WIDTH, BLOCK_HEIGHT)),
+    "special_plastic": ("special_plastic.png", (BLOCK_WIDTH, BLOCK_HEIGHT)),
+    "bin": ("bin.png", (BIN_WIDTH, BIN_HEIGHT)),  # adjust BIN_WIDTH & BIN_HEIGHT
+}
+
+# Pictures for each window scale are made once, on a worker thread, and
+# the last few are kept (see assets.py)
+def build_scale(scale):
+    return build_assets(scale, background_image, (SCREEN_WIDTH, SCREEN_HEIGHT), SPRITES, ".atlas_cache")
+assets = AssetLoader(build_scale)
+
+# Font sizes (logical pixels)
+FONT_SIZES = {"title": 64, "sub": 36, "button": 48, "hud": 36, "game_over": 72, "float": 36, "level_up": 64}
+HINT_MESSAGE = "Use mouse to drag and drop plastic, p to pause."
+
+sprites = RenderQueue(("blocks", "bins", "popups"))  # drawn with one blits() call per layer
+renderer = DirtyRenderer(screen, None, DIRTY_RECTS)
+governor = QualityGovernor()  # lowers resolution and drops popups if frames take too long (governor.py)
+lod = LodSelector()  # cheaper block drawing when there are hundreds of them (lod.py)
+compositor = None
+
+
+# Fonts and pre-rendered text for one scale. HUD and popup text is put
+# together from pre-rendered digits and labels (see text.py) instead of
+# calling font.render() every frame. Made on the main thread (fonts
+# aren't safe to use from two threads) and kept with the scale's assets.
+def text_for(bundle):
+    if bundle.extra is not None:
+        return bundle.extra
+    fonts = {name: pygame.font.SysFont(None, max(8, round(size * bundle.scale))) for name, size in FONT_SIZES.items()}
+    fonts["hud_text"] = GlyphAtlas(fonts["hud"], (255, 255, 255), ("Points: ", "Lives: ", "Level: ", "High Score: "))
+    fonts["popup_text"] = {
+        "normal": GlyphAtlas(fonts["float"], POPUP_COLORS["normal"], ("+",)),
+        "special": GlyphAtlas(fonts["float"], POPUP_COLORS["special"], ("+",)),
+        "level_up": GlyphAtlas(fonts["level_up"], POPUP_COLORS["level_up"], ("Level ", "!")),
+    }
+    bundle.extra = fonts
+    return fonts
+
+
+# Switch the menus over to bundle's scale and the current window size,
+# gameplay goes back to full resolution at the same scale
+def use_assets(bundle):
+    global current_bundle, screen, viewport, title_ui, play_levels_button, free_play_button, pause_ui
+    global game_over_ui, final_score_label, best_score_label, level_reached_label, continue_label, shown_ui
+    current_bundle = bundle
+    screen = pygame.display.get_surface()
+    viewport = Viewport((SCREEN_WIDTH, SCREEN_HEIGHT), screen.get_size(), bundle.scale)
+    at = viewport.to_screen
+    fonts = text_for(bundle)
+    use_play_assets(bundle)
+
+    # Menu screens are widgets that keep their rendered text (see ui.py), a
+    # screen only repaints what changed since it was last shown
+    menu_background = letterbox(bundle.background, viewport)
+    title_ui = UILayer(menu_background, [
+        Label(fonts["title"], "Plastic Collector Game", (255, 255, 255), center=at(SCREEN_WIDTH // 2, 50)),
+        Label(fonts["sub"], "by Jayden Lal", (255, 255, 255), center=at(SCREEN_WIDTH // 2, 110)),
+    ])
+    # Home screen buttons
+    padding = (viewport.length(20), viewport.length(10))
+    play_levels_button = title_ui.add(Button(fonts["button"], "Play (Levels)", (255,255,255), button_fill_color, button_border_color,
+                                             padding, center=at(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 40)))
+    free_play_button = title_ui.add(Button(fonts["button"], "Free Play", (255,255,255), button_fill_color, button_border_color,
+                                           padding, center=at(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 40)))
+
+    pause_ui = UILayer(menu_background, [
+        Label(fonts["hud"], "PAUSED", (255, 255, 0), center=at(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20)),
+        Label(fonts["hud"], "Press ESC to quit to Home", (200, 200, 200), center=at(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40)),
+    ])
+
+    game_over_background = pygame.Surface(viewport.window_size)
+    game_over_background.fill((0, 0, 0))
+    game_over_ui = UILayer(game_over_background, [
+        Label(fonts["game_over"], "GAME OVER", (255, 0, 0), midtop=at(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 80)),
+    ])
+    final_score_label = game_over_ui.add(Label(fonts["hud"], "", (255, 255, 255), midtop=at(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 10)))
+    best_score_label = game_over_ui.add(Label(fonts["hud"], "", (255, 255, 255), midtop=at(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 30)))
+    level_reached_label = game_over_ui.add(Label(fonts["hud"], "", (255, 255, 255), midtop=at(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 70)))
+    continue_label = game_over_ui.add(Label(fonts["hud"], "Press SPACE to continue", (200, 200, 200)))
+    shown_ui = None  # whatever menu was up has to be drawn again
+
+
+# Switch gameplay drawing over to bundle. At the window's own scale that
+# draws straight onto the screen. A smaller scale (the quality governor
+# lowering the resolution) draws onto frame, which is scaled up to the
+# window when the frame is shown.
+def use_play_assets(bundle):
+    global play_bundle, play_view, frame, compositor, sprite_sheet, plastic_area, special_plastic_area, bin_area
+    global hud_text, popup_text, hint_panel, block_colors, block_edges, block_dots
+    play_bundle = bundle
+    if bundle is current_bundle:
+        play_view = viewport
+        frame = None
+        renderer.screen = screen
+    else:
+        size = (round(SCREEN_WIDTH * bundle.scale), round(SCREEN_HEIGHT * bundle.scale))
+        play_view = Viewport((SCREEN_WIDTH, SCREEN_HEIGHT), size, bundle.scale)  # just the play area, no bars
+        frame = pygame.Surface(play_view.size).convert()
+        renderer.screen = frame
+    at = play_view.to_screen
+    fonts = text_for(bundle)
+    hud_text = fonts["hud_text"]
+    popup_text = fonts["popup_text"]
+
+    sprite_sheet = bundle.atlas.surface
+    plastic_area = bundle.atlas.rects["plastic"]
+    special_plastic_area = bundle.atlas.rects["special_plastic"]
+    bin_area = bundle.atlas.rects["bin"]
+
+    # Stand-ins for blocks at a high LOD: each sprite's average colour, and
+    # a solid square of it half a block wide
+    block_colors = {}
+    block_edges = {}
+    block_dots = {}
+    for block_type, area in ((NORMAL, plastic_area), (SPECIAL, special_plastic_area)):
+        block_colors[block_type] = pygame.transform.average_color(sprite_sheet, area, True)[:3]  # not counting the see-through part
+        block_edges[block_type] = tuple(c // 2 for c in block_colors[block_type])
+        block_dots[block_type] = pygame.Surface((play_view.length(BLOCK_WIDTH // 2), play_view.length(BLOCK_HEIGHT // 2))).convert()
+        block_dots[block_type].fill(block_colors[block_type])
+
+    # Gameplay backdrop: the background is a cached static layer, the
+    # conveyor belt under the bins scrolls on its own strip (see layers.py)
+    if compositor is None:
+        compositor = LayerCompositor(bundle.background, play_view, CONVEYOR_HEIGHT)
+    else:
+        compositor.resize(bundle.background, play_view)
+    renderer.set_background(compositor.static)
+
+    # Start of game hint, drawn during gameplay
+    hint_panel = Panel(fonts["hud"], HINT_MESSAGE, (255, 255, 255), padding=(play_view.length(10), play_view.length(5)),
+                       midtop=at(SCREEN_WIDTH // 2, 110))  # under the title area
+
+
+# The window is a new size (or went in or out of fullscreen): use the
+# assets for its scale once they're ready, checked every frame from then
+def window_resized():
+    global resize_at, screen
+    screen = pygame.display.get_surface()
+    if frame is None:
+        renderer.screen = screen
+    renderer.invalidate()
+    resize_at = time.perf_counter() + RESIZE_DELAY  # a drag-resize sends lots of these, wait for it to stop
+
+
+def toggle_fullscreen():
+    global fullscreen, windowed_size
+    fullscreen = not fullscreen
+    if fullscreen:
+        windowed_size = screen.get_size()
+        pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    else:
+        pygame.display.set_mode(windowed_size, pygame.RESIZABLE)
+    window_resized()
+
+
+# Current game (a Simulation), None until a mode is picked
+sim = None
+game_mode = None  # None, "levels", or "freeplay"
+
+clock = pygame.time.Clock()
+
+# Send the frame to the display, everything (rects=None) or just some
+# rects. Every frame goes through here so the input latency stats know
+# when it was shown.
+latency = LatencyTracker()
+def present(rects=None):
+    if rects is None:
+        pygame.display.flip()
+    else:
+        pygame.display.update(rects)
+    latency.presented()
+
+# Show a menu screen, sending only what changed to the display
+shown_ui = None
+def show_ui(layer):
+    global shown_ui
+    if layer is not shown_ui:
+        layer.invalidate()  # something else was on screen
+        shown_ui = layer
+    rects = layer.draw(screen)
+    if rects:
+        present(rects)
+    renderer.invalidate()  # gameplay has to repaint everything after this
+
+use_assets(assets.load(1.0))
+resize_at = None  # when to pick up the new window size, None if it hasn't changed
+
+
+# Start a new game in mode ("levels" or "freeplay")
+def start_game(mode):
+    global sim, game_mode
+    game_mode = mode
+    sim = Simulation(game_mode)
+    playing.accumulator = 0.0
+    scenes.switch("playing")
+
+
+# Back to the title screen, the game is thrown away
+def reset_game():
+    global sim
+    sim = None
+    scenes.switch("title")
+
+
+# The screens of the game. Menus are IDLE scenes: they sleep until there's
+# an event instead of redrawing (and burning CPU) at the frame rate, and
+# their UILayers only repaint what changed anyway (see scenes.py).
+class TitleScene(Scene):
+    tick_policy = IDLE
+    events = (pygame.MOUSEBUTTONDOWN,)
+
+    def handle(self, event):
+        # level buttons
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if play_levels_button.collidepoint(event.pos):
+                start_game("levels")
+            elif free_play_button.collidepoint(event.pos):
+                start_game("freeplay")
+
+    def draw(self):
+        show_ui(title_ui)
+
+
+class PlayingScene(Scene):
+    # Fixed timestep: real time piles up in the accumulator and the sim eats
+    # it one TICK at a time, so a slow frame means fewer frames drawn, not a
+    # slower game. Whatever is left over is used to blend positions.
+    tick_policy = FRAME
+    events = (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION)
+
+    def __init__(self):
+        self.accumulator = 0.0
+        self.alpha = 0.0
+
+    def enter(self):
+        global shown_ui
+        shown_ui = None
+
+    # The other scenes don't listen to the mouse, so a button let go of
+    # while paused would never reach release()
+    def leave(self):
+        sim.release()
+
+    def handle(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+            scenes.switch("paused")
+
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            # Check if clicked on any block
+            sim.grab(viewport.to_logical(event.pos))
+
+        # Mouse drag and drop
+        elif event.type == pygame.MOUSEMOTION and sim.dragging_block is not None:
+            sim.drag_to(viewport.to_logical(event.pos))  # clamped within game window
+
+        # let go of plastic
+        elif event.type == pygame.MOUSEBUTTONUP:
+            sim.release()
+
+    def update(self, frame_time):
+        global high_score, highest_level_points
+        # Advance the game in fixed ticks (spawning, falling, collisions, lives, levels)
+        self.accumulator += frame_time
+        while self.accumulator >= TICK and not sim.game_over:
+            self.accumulator -= TICK
+            sim.step()
+            for sim_event in sim.events:
+                if sim_event[0] == "collect":
+                    effect_sound.play()  # the "+100" popup itself comes from the sim
+        self.alpha = self.accumulator / TICK  # how far we are into the next tick
+        points = sim.points
+
+        # Only write highscore in freeplay
+        if game_mode == "freeplay" and points > high_score:
+            high_score = points
+            with open("highscore.txt", "w") as f:
+                f.write(str(high_score))
+
+        # Only write levels highest points in levels mode
+        if game_mode == "levels" and points > highest_level_points:
+            highest_level_points = points
+            with open("highest_level_points.txt", "w") as f:
+                f.write(str(highest_level_points))
+
+        if sim.game_over:
+            scenes.switch("game_over")
+
+    def draw(self):
+        # Resolution the governor wants, switched to once its assets are ready
+        play_scale = snap_scale(viewport.scale * governor.quality["resolution"])
+        if play_scale != play_bundle.scale:
+            bundle = current_bundle if play_scale == current_bundle.scale else assets.get(play_scale)
+            if bundle is not None:
+                use_play_assets(bundle)
+
+        renderer.begin()
+        renderer.screen.set_clip(play_view.rect)  # bins coming in at the sides stay out of the black bars
+        compositor.draw_moving(renderer, sim.interpolated_belt(self.alpha))  # conveyor belt
+
+        # Draw blocks (different image for special), in window pixels. With
+        # lots of blocks crowded cells are drawn as one box each, and with
+        # even more the rest are solid squares instead of sprites.
+        block_types, xs, ys = sim.interpolated_blocks(self.alpha, skip_held=True)
+        if lod.update(len(xs)) > 0:
+            loose, boxes, box_types = find_clusters(xs, ys, block_types)
+            boxes = boxes * play_view.scale + (play_view.offset * 2)  # offset is added to both corners
+            width, height = play_view.length(BLOCK_WIDTH), play_view.length(BLOCK_HEIGHT)
+            for (x0, y0, x1, y1), box_type in zip(boxes.tolist(), box_types.tolist()):
+                box = renderer.fill(block_colors[box_type], (x0, y0, x1 - x0 + width, y1 - y0 + height))
+                pygame.draw.rect(renderer.screen, block_edges[box_type], box, 1)  # so touching clusters don't merge into one
+            block_types, xs, ys = block_types[loose], xs[loose], ys[loose]
+        xs = xs * play_view.scale + play_view.offset[0]
+        ys = ys * play_view.scale + play_view.offset[1]
+        # oldest first like the sim has them, so the one drawn on top is the one a click picks
+        if lod.level < 2:
+            looks = {NORMAL: (sprite_sheet, plastic_area), SPECIAL: (sprite_sheet, special_plastic_area)}  # special image
+        else:
+            inset = play_view.length(BLOCK_WIDTH // 4)  # dots go in the middle of where the block is
+            xs, ys = xs + inset, ys + inset
+            looks = {NORMAL: (block_dots[NORMAL], None), SPECIAL: (block_dots[SPECIAL], None)}
+        sprites.add_sprites("blocks", ((looks[block_type][0], (x, y), looks[block_type][1])
+                                       for block_type, x, y in zip(block_types.tolist(), xs.tolist(), ys.tolist())))
+
+        # Draw bins
+        sprites.add_many("bins", sprite_sheet, (play_view.to_screen(x, y) for x, y in sim.interpolated_bins(self.alpha)), bin_area)
+        sprites.flush(renderer, ("blocks", "bins"))
+
+        # Draw HUD
+        points_text = hud_text.render(f"Points: {sim.points}")
+        lives_text = hud_text.render(f"Lives: {sim.lives}")
+        renderer.blit(points_text, play_view.to_screen(10, 10))
+        renderer.blit(lives_text, play_view.to_screen(10, 40))
+
+        # Show the temporary hint at the start of a game
+        if sim.hint_visible:
+            hint_panel.draw(renderer)
+                
+        # Show current level only in Levels mode
+        if game_mode == "levels":
+            level_text = hud_text.render(f"Level: {sim.current_level}")
+            renderer.blit(level_text, play_view.to_screen(10, 70))
+        elif game_mode == "freeplay":
+            high_score_text = hud_text.render(f"High Score: {high_score}")
+            renderer.blit(high_score_text, play_view.to_screen(10, 70))
+                    
+        # Draw floating texts (score popups and level ups), they're the
+        # first thing to go when the machine can't keep up
+        if governor.quality["popups"]:
+            for kind, text_id, x, y in zip(*sim.interpolated_popups(self.alpha)):
+                kind = POPUP_KINDS[kind]
+                surface = popup_text[kind].render(sim.popups.texts[text_id])
+                x, y = play_view.to_screen(x, y)
+                if kind == "level_up":
+                    x -= surface.get_width() / 2  # level ups are centered, score popups start at the bin's middle
+                sprites.add("popups", surface, (x, y))
+            sprites.flush(renderer, ("popups",))
+
+        # Late latch: the held block goes on last, where the mouse is right
+        # now instead of where it was when this frame's events were handled
+        # (the sim gets the new position too, so it's what hits the bins)
+        if any(pygame.mouse.get_pressed()):  # any button grabs a block
+            sim.drag_to(viewport.to_logical(pygame.mouse.get_pos()))  # does nothing if there's no block held
+        else:
+            sim.release()  # the button went up where we didn't see it (outside the window)
+        held = sim.held_block()
+        if held is not None:
+            block_type, x, y = held
+            renderer.blit(sprite_sheet, play_view.to_screen(x, y), special_plastic_area if block_type == SPECIAL else plastic_area)
+
+        # Update display (just the rects that changed)
+        renderer.screen.set_clip(None)
+        rects = renderer.finish()
+        if frame is None:
+            present(rects)
+        else:
+            # drawn smaller, scale the changed parts up onto the window
+            if rects is None:
+                screen.fill((0, 0, 0))  # black bars
+                upscale(frame, None, screen, viewport.rect)
+                present()
+            else:
+                present(upscale(frame, rects, screen, viewport.rect))
+
+        # Let the governor know how long this frame took, it drops or
+        # raises the quality level to stay inside the frame budget
+        if governor.add(time.perf_counter() - scenes.frame_start):
+            caption = "Plastic Collector Game" if governor.level == 0 else f"Plastic Collector Game ({governor.name})"
+            pygame.display.set_caption(caption)
+
+
+class PausedScene(Scene):
+    tick_policy = IDLE
+    events = (pygame.KEYDOWN,)
+
+    def handle(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_p:
+                scenes.switch("playing")
+            elif event.key == pygame.K_ESCAPE:  # ESC to exit to home
+                reset_game()
+
+    def draw(self):
+        show_ui(pause_ui)
+
+
+class GameOverScene(Scene):
+    tick_policy = IDLE
+    events = (pygame.KEYDOWN,)
+
+    def handle(self, event):
+        # SPACE to continue
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+            reset_game()
+
+    def draw(self):
+        final_score_label.set_text(f"Final Score: {sim.points}")
+        if game_mode == "freeplay":
+            best_score_label.set_text(f"High Score: {high_score}")
+            level_reached_label.set_text("")
+            last_y = SCREEN_HEIGHT // 2 + 30
+        else:  # levels mode
+            best_score_label.set_text(f"Highest Level Points: {highest_level_points}")
+            level_reached_label.set_text(f"Game Ended on Level {sim.current_level}")
+            last_y = SCREEN_HEIGHT // 2 + 70
+
+        # Press SPACE hint
+        continue_label.move(midtop=viewport.to_screen(SCREEN_WIDTH // 2, last_y + 40))  # always 40px below the last text
+        show_ui(game_over_ui)
+
+
+# Window events work the same on every screen
+WINDOW_EVENTS = (pygame.KEYDOWN, pygame.VIDEORESIZE, pygame.WINDOWSIZECHANGED, pygame.WINDOWEXPOSED,
+                 pygame.WINDOWFOCUSLOST, pygame.WINDOWFOCUSGAINED, pygame.WINDOWMINIMIZED,
+                 pygame.WINDOWMAXIMIZED, pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.WINDOWHIDDEN)
+def handle_window_event(event):
+    global shown_ui
+    if event.type == pygame.KEYDOWN and event.key == pygame.K_F11:
+        toggle_fullscreen()
+    elif event.type == pygame.VIDEORESIZE:
+        window_resized()
+    elif event.type == pygame.WINDOWEXPOSED:
+        shown_ui = None  # the window's contents were lost, draw everything again
+        renderer.invalidate()
+    elif power.handle(event):
+        # Nobody's looking: pause the game and only wake up a few times a
+        # second, and don't draw at all while the window's hidden
+        if power.low_power and scenes.name == "playing":
+            scenes.switch("paused")
+        scenes.fps = LOW_POWER_FPS if power.low_power else RENDER_FPS
+        scenes.idle_timeout = 1000 // LOW_POWER_FPS if power.low_power else IDLE_TIMEOUT
+        scenes.drawing = not power.hidden
+        if not power.hidden:
+            shown_ui = None
+            renderer.invalidate()
+
+
+# Pick up a new window size once it has stopped changing
+def check_resize():
+    global resize_at
+    if resize_at is not None and time.perf_counter() >= resize_at:
+        window_size = screen.get_size()
+        bundle = assets.get(scale_for(window_size, (SCREEN_WIDTH, SCREEN_HEIGHT)))
+        if bundle is not None:
+            use_assets(bundle)
+            resize_at = None
+        elif viewport.window_size != window_size:
+            use_assets(current_bundle)  # old scale, centered in the new window, until the new scale's ready
+
+
+# Game loop
+power = PowerManager()  # low power mode when the window's in the background (power.py)
+playing = PlayingScene()
+scenes = SceneManager({
+    "title": TitleScene(),
+    "playing": playing,
+    "paused": PausedScene(),
+    "game_over": GameOverScene(),
+}, clock, RENDER_FPS, MAX_FRAME_TIME)
+scenes.on_event = handle_window_event
+scenes.always_allowed += WINDOW_EVENTS
+if LATENCY_STATS:
+    scenes.latency = latency
+scenes.before_frame = check_resize
+scenes.run("title")
+
+if LATENCY_STATS and latency.samples:
+    print(latency.report())
+
+# Quit
+pygame.quit()
+sys.exit()
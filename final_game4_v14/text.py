@@ -0,0 +1,68 @@
+import pygame
+
+from atlas import paste
+
+CACHE_SIZE = 64  # finished strings kept per atlas
+
+
+class GlyphAtlas:
+    # Text in one font and colour, built from pieces rendered only once.
+    # Single characters (digits, "+", ...) and whole label fragments like
+    # "Points: " are rasterized the first time they're needed and kept;
+    # a string is put together by blitting those pieces side by side, so
+    # "Points: 1250" costs a few blits instead of a font.render().
+    #
+    # Finished strings are cached too, so a HUD number that hasn't changed
+    # since last frame is just a dict lookup. The oldest string is dropped
+    # once there are more than CACHE_SIZE of them.
+
+    def __init__(self, font, color, fragments=()):
+        self.font = font
+        self.color = color
+        self.fragments = sorted(fragments, key=len, reverse=True)  # longest match first
+        self.glyphs = {}  # piece -> surface
+        self.cache = {}  # string -> surface
+        for piece in self.fragments:
+            self.glyph(piece)
+        for digit in "0123456789":
+            self.glyph(digit)
+
+    def glyph(self, piece):
+        surface = self.glyphs.get(piece)
+        if surface is None:
+            surface = self.glyphs[piece] = self.font.render(piece, True, self.color)
+        return surface
+
+    # Split text into known fragments and single characters
+    def pieces(self, text):
+        pieces = []
+        start = 0
+        while start < len(text):
+            for fragment in self.fragments:
+                if text.startswith(fragment, start):
+                    pieces.append(fragment)
+                    start += len(fragment)
+                    break
+            else:
+                pieces.append(text[start])
+                start += 1
+        return pieces
+
+    def render(self, text):
+        surface = self.cache.get(text)
+        if surface is not None:
+            return surface
+
+        glyphs = [self.glyph(piece) for piece in self.pieces(text)]
+        width = sum(glyph.get_width() for glyph in glyphs)
+        height = max([glyph.get_height() for glyph in glyphs], default=self.font.get_height())
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        x = 0
+        for glyph in glyphs:
+            paste(surface, glyph, (x, 0))  # pieces don't overlap
+            x += glyph.get_width()
+
+        if len(self.cache) >= CACHE_SIZE:
+            del self.cache[next(iter(self.cache))]
+        self.cache[text] = surface
+        return surface
@@ -0,0 +1,152 @@
+import pygame
+
+
+class Widget:
+    # A piece of UI that keeps its rendered surface until something about
+    # it changes. Subclasses say how to build the surface (build()) and
+    # where it goes is given as a pygame.Rect position keyword, e.g.
+    # Label(..., center=(400, 50)). draw() works on anything with a
+    # Surface-style blit(), so the screen or the DirtyRenderer.
+
+    def __init__(self, **anchor):
+        self.anchor = anchor
+        self.surface = None
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.drawn_rect = pygame.Rect(0, 0, 0, 0)  # where it was last drawn, to paint over when it changes
+        self.changed = True  # needs drawing again
+
+    def build(self):
+        raise NotImplementedError
+
+    def invalidate(self):
+        self.surface = None
+        self.changed = True
+
+    def move(self, **anchor):
+        if anchor != self.anchor:
+            self.anchor = anchor
+            if self.surface is not None:
+                self.rect = self.surface.get_rect(**anchor)  # same surface, just somewhere else
+            self.changed = True
+
+    # Surface and rect, rebuilt only after a change
+    def layout(self):
+        if self.surface is None:
+            self.surface = self.build()
+            self.rect = self.surface.get_rect(**self.anchor)
+        return self.surface
+
+    def draw(self, target):
+        self.layout()
+        target.blit(self.surface, self.rect)
+        self.drawn_rect = self.rect.copy()
+        self.changed = False
+        return self.rect
+
+
+class Label(Widget):
+    def __init__(self, font, text, color, **anchor):
+        super().__init__(**anchor)
+        self.font = font
+        self.text = text
+        self.color = color
+
+    def set_text(self, text):
+        if text != self.text:
+            self.text = text
+            self.invalidate()
+
+    def build(self):
+        return self.font.render(self.text, True, self.color)
+
+
+class Button(Label):
+    # Label on a filled box with a border. rect is the whole box, which
+    # is also the area that takes clicks.
+    def __init__(self, font, text, color, fill_color, border_color, padding=(20, 10), **anchor):
+        super().__init__(font, text, color, **anchor)
+        self.fill_color = fill_color
+        self.border_color = border_color
+        self.padding = padding
+
+    def build(self):
+        text = super().build()
+        box = text.get_rect().inflate(self.padding)
+        surface = pygame.Surface(box.size)
+        surface.fill(self.fill_color)
+        pygame.draw.rect(surface, self.border_color, surface.get_rect(), 3)
+        surface.blit(text, text.get_rect(center=surface.get_rect().center))
+        return surface
+
+    def collidepoint(self, pos):
+        self.layout()
+        return self.rect.collidepoint(pos)
+
+
+class Panel(Widget):
+    # Translucent box with a line of text on it. The box and the text are
+    # drawn separately so the text stays fully opaque.
+    def __init__(self, font, text, color, box_color=(0, 0, 0), alpha=120, padding=(10, 5), **anchor):
+        super().__init__(**anchor)
+        self.label = Label(font, text, color)
+        self.box_color = box_color
+        self.alpha = alpha
+        self.padding = padding
+
+    def build(self):
+        text = self.label.layout()
+        surface = pygame.Surface((text.get_width() + 2 * self.padding[0], text.get_height() + 2 * self.padding[1]))
+        surface.set_alpha(self.alpha)
+        surface.fill(self.box_color)
+        return surface
+
+    def layout(self):
+        if self.surface is None:
+            super().layout()
+            self.label.move(topleft=(self.rect.x + self.padding[0], self.rect.y + self.padding[1]))
+        return self.surface
+
+    def draw(self, target):
+        super().draw(target)
+        self.label.draw(target)
+        return self.rect
+
+
+class UILayer:
+    # One screen's worth of widgets over a background (title, pause, game
+    # over). The first draw() paints everything. After that it only
+    # repaints widgets that changed, so a screen where nothing happens
+    # costs nothing. draw() returns the rects that need to go to the
+    # display, for pygame.display.update(). Widgets shouldn't overlap:
+    # repainting one doesn't redraw its neighbours.
+
+    def __init__(self, background, widgets=()):
+        self.background = background
+        self.widgets = list(widgets)
+        self.full = True
+
+    def add(self, widget):
+        self.widgets.append(widget)
+        self.full = True
+        return widget
+
+    # Repaint everything on the next draw (the screen was drawn over)
+    def invalidate(self):
+        self.full = True
+
+    def draw(self, screen):
+        if self.full:
+            screen.blit(self.background, (0, 0))
+            for widget in self.widgets:
+                widget.draw(screen)
+            self.full = False
+            return [screen.get_rect()]
+
+        rects = []
+        for widget in self.widgets:
+            if widget.changed:
+                old = widget.drawn_rect  # not widget.rect, it may have moved since
+                screen.blit(self.background, old, old)
+                rects.append(old)
+                rects.append(widget.draw(screen))
+        return rects
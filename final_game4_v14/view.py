@@ -0,0 +1,50 @@
+import pygame
+
+SCALE_STEP = 0.05  # scales are rounded to this, so a drag-resize only ever needs a few asset sets
+MIN_SCALE = 0.25
+
+
+# scale rounded down to a SCALE_STEP
+def snap_scale(scale):
+    return max(MIN_SCALE, round(int(scale / SCALE_STEP + 1e-6) * SCALE_STEP, 2))
+
+
+# Biggest scale that fits the logical screen in the window
+def scale_for(window_size, logical_size):
+    return snap_scale(min(window_size[0] / logical_size[0], window_size[1] / logical_size[1]))
+
+
+class Viewport:
+    # Where the game's logical 800x600 screen sits in the real window. The
+    # game (sim, layout, clicks) works in logical pixels and the viewport
+    # turns them into window pixels: everything is scaled by scale and the
+    # play area is centered, with black bars round it if the window's
+    # shape doesn't match.
+
+    def __init__(self, logical_size, window_size, scale):
+        self.logical_size = logical_size
+        self.window_size = window_size
+        self.scale = scale
+        self.size = (round(logical_size[0] * scale), round(logical_size[1] * scale))  # play area in window pixels
+        self.offset = ((window_size[0] - self.size[0]) // 2, (window_size[1] - self.size[1]) // 2)
+        self.rect = pygame.Rect(self.offset, self.size)
+
+    def to_screen(self, x, y):
+        return (self.offset[0] + x * self.scale, self.offset[1] + y * self.scale)
+
+    # Window position (e.g. the mouse) to logical, can be outside the play area
+    def to_logical(self, pos):
+        return ((pos[0] - self.offset[0]) / self.scale, (pos[1] - self.offset[1]) / self.scale)
+
+    # Logical length to window pixels
+    def length(self, value):
+        return round(value * self.scale)
+
+
+# Window-sized surface with picture (already play area sized) in the play
+# area and black round it
+def letterbox(picture, viewport):
+    surface = pygame.Surface(viewport.window_size).convert()
+    surface.fill((0, 0, 0))
+    surface.blit(picture, viewport.offset)
+    return surface